@@ -1,15 +1,22 @@
 from udp_con import UDPConnection
+from com_router import ComRouter
+from serial_service import SerialService
+from rfc2217_codec import Rfc2217Codec, IAC
+import control_packet
 
 import json
+import logging
 import threading
 import time
-import queue
+import collections
 
 import asyncio
 import uuid
 import secrets
 import os
 import base64
+import socket
+import struct
 import websockets
 
 try:
@@ -20,6 +27,9 @@ except ImportError:
     serial_available = False
     print("pyserial not available - COM port forwarding disabled")
 
+# udp_con reports connection progress at INFO
+logging.basicConfig(level=logging.INFO)
+
 # Generate a unique ID based on MAC address + random string (unique per instance)
 uid_hex = format(uuid.getnode(), 'x') + secrets.token_hex(8)
 
@@ -62,25 +72,261 @@ map_iris = lambda value: (value + 512) >> 4
 map_focus = lambda value: (value + 512) >> 4
 map_pitch = lambda value: int(value * 0.2)
 
-async def send_udp_message(values, channel):
-    # Pack values into a UDP message
+async def send_udp_message(values, channel, encoder=None):
+    """Send the control values; with a DeltaEncoder, only what changed or a due heartbeat."""
     values = values.copy()  # Don't modify the original
     values[1] = map_pitch(values[1])
     values[3] = map_zoom(values[3])
     values[4] = map_focus(values[4])
     values[5] = map_iris(values[5])
-    # Pack values into bytes
-    message_bytes = bytes([0xDE, 0xFD, values[3] & 0xFF, (values[3] >> 8) & 0xFF,
-                           (values[4] >> 8) & 0xFF, values[4] & 0xFF,
-                           (values[5] >> 8) & 0xFF, values[5] & 0xFF,
-                           (values[0] >> 8) & 0xFF, values[0] & 0xFF,
-                           (values[1] >> 8) & 0xFF, values[1] & 0xFF,
-                           (values[2] >> 8) & 0xFF, values[2] & 0xFF,
-                           0x00, 0x00])
+    if encoder:
+        message_bytes = encoder.update(int(time.monotonic() * 1000), zoom=values[3], focus=values[4],
+                                       iris=values[5], yaw=values[0], pitch=values[1], roll=values[2])
+        if message_bytes is None:
+            return
+    else:
+        message_bytes = control_packet.encode(zoom=values[3], focus=values[4], iris=values[5],
+                                              yaw=values[0], pitch=values[1], roll=values[2])
     if channel:
         await channel.send(message_bytes)
 
-joystick = None
+# Gimbal telemetry streamed back by heads over the unreliable channel (see bgc.py on the head)
+TELEMETRY_HEADER = 0xDE
+TELEMETRY_GIMBAL = 0xB1
+TELEMETRY_FORMAT = "<2BHB3h3hHH3B"
+TELEMETRY_SIZE = struct.calcsize(TELEMETRY_FORMAT)
+TELEMETRY_MOTORS_ON = 0x01
+TELEMETRY_STATE_VALID = 0x02
+ANGLE_UNIT = 0.02197265625  # degrees per LSB of a SimpleBGC angle
+
+# Lens telemetry (see camera_sony.py on the head): zoom, focus, iris, valid flags
+TELEMETRY_LENS = 0xB2
+LENS_TELEMETRY_FORMAT = "<2B3HB"
+LENS_TELEMETRY_SIZE = struct.calcsize(LENS_TELEMETRY_FORMAT)
+
+# Sled telemetry batches (see rail.py on the equipoise head): header, type, count,
+# then per sample time (ms), position (m), velocity (m/s), Iq (A), axis error flags
+TELEMETRY_SLED = 0xB3
+SLED_BATCH_FORMAT = "<3B"
+SLED_BATCH_SIZE = struct.calcsize(SLED_BATCH_FORMAT)
+SLED_SAMPLE_FORMAT = "<IfffI"
+SLED_SAMPLE_SIZE = struct.calcsize(SLED_SAMPLE_FORMAT)
+
+def format_gimbal_telemetry(event):
+    """Build the GUI status line for a GIMBAL_TELEMETRY event."""
+    roll, pitch, yaw = event["angles"]
+    text = f"Yaw {yaw:+7.2f}°  Pitch {pitch:+7.2f}°  Roll {roll:+7.2f}°"
+    if event["state_valid"]:
+        text += "  Motors " + ("ON" if event["motors_on"] else "OFF")
+        text += "  Power " + "/".join(str(p) for p in event["motor_power"])
+        if event["system_error"]:
+            text += f"  ERROR 0x{event['system_error']:04X}"
+    return text
+
+def format_lens_telemetry(event):
+    """Build the GUI status line for a LENS_TELEMETRY event."""
+    parts = []
+    for name in ("zoom", "focus", "iris"):
+        value = event[name]
+        parts.append(f"{name.capitalize()} {value:#06x}" if value is not None else f"{name.capitalize()} ?")
+    return "  ".join(parts)
+
+def format_sled_telemetry(event):
+    """Build the GUI status line for a SLED_TELEMETRY event."""
+    text = f"Sled {event['pos']:6.3f} m  {event['vel']:+6.3f} m/s  Iq {event['iq']:+6.2f} A (peak {event['iq_peak']:.2f})"
+    if event["errors"]:
+        text += f"  ERROR 0x{event['errors']:08X}"
+    return text
+
+class GuiBridge:
+    """
+    Hand events between the Tk thread and the asyncio loop without polling.
+
+    to_async() (GUI side) schedules the event onto the loop's queue with
+    call_soon_threadsafe. to_gui() (any other thread) queues the event and
+    wakes Tk with a virtual event; Tk's event_generate is marshalled to the
+    Tk thread, and only the first event of a batch generates one.
+    """
+    WAKE_EVENT = "<<AsyncToGui>>"
+
+    def __init__(self):
+        self.loop = None
+        self.root = None
+        self._handler = None
+        self._lock = threading.Lock()
+        self._to_gui = collections.deque()
+        self._wake_pending = False
+        self._to_async = asyncio.Queue()
+
+    def attach_loop(self, loop):
+        self.loop = loop
+
+    def attach_gui(self, root, handler):
+        """Tk thread, before mainloop(): deliver to_gui() events to handler(event)."""
+        root.bind(self.WAKE_EVENT, self._drain)
+        with self._lock:
+            self.root = root
+            self._handler = handler
+        # Anything posted before Tk was ready
+        root.after_idle(self._drain)
+
+    def to_gui(self, event):
+        with self._lock:
+            self._to_gui.append(event)
+            if self._wake_pending or self.root is None:
+                return
+            self._wake_pending = True
+            root = self.root
+        try:
+            root.event_generate(self.WAKE_EVENT, when="tail")
+        except (RuntimeError, tk.TclError):
+            # Tk isn't in its main loop (yet, or any more); the event waits for the next drain
+            with self._lock:
+                self._wake_pending = False
+
+    def _drain(self, _event=None):
+        with self._lock:
+            self._wake_pending = False
+            events = list(self._to_gui)
+            self._to_gui.clear()
+        for event in events:
+            self._handler(event)
+
+    def to_async(self, event):
+        self.loop.call_soon_threadsafe(self._to_async.put_nowait, event)
+
+    async def get(self):
+        """Asyncio thread: wait for the next event posted by the GUI."""
+        return await self._to_async.get()
+
+def joystick_input_thread(loop):
+    """
+    Sample the joystick at JOYSTICK_HZ on its own thread. Changed axis values
+    go straight to the asyncio loop; button and hat presses go to the GUI.
+    """
+    try:
+        import pygame
+        pygame.init()
+        pygame.joystick.init()
+        joysticks = []
+        for i in range(pygame.joystick.get_count()):
+            js = pygame.joystick.Joystick(i)
+            js.init()
+            print(f"Joystick {i} name: {js.get_name()} axes: {js.get_numaxes()} hats: {js.get_numhats()} buttons: {js.get_numbuttons()}")
+            joysticks.append(js)
+    except Exception as e:
+        print("Joystick init failed:", e)
+        return
+
+    joystick = None
+    # Track previous button states for edge detection
+    prev_buttons = None
+    prev_hats = None
+    prev_values = None
+    period = 1.0 / JOYSTICK_HZ
+    next_sample = time.monotonic()
+
+    def gui_action(action):
+        gui_bridge.to_gui({"type": "JOYSTICK_ACTION", "action": action})
+
+    while True:
+        pygame.event.pump()
+        if not joystick:
+            for j in joysticks:
+                buttons = [j.get_button(i) for i in range(j.get_numbuttons())]
+
+                lb_button = buttons[4] or buttons[6]
+                rb_button = buttons[5] or buttons[7]
+
+                if lb_button and rb_button:
+                    joystick = j
+                    print(f"Selected joystick name: {joystick.get_name()}")
+                    prev_buttons = None  # Reset previous button states when joystick is selected
+                    prev_hats = None  # Reset previous hat states when joystick is selected
+                    break
+
+        else:
+            axes = [joystick.get_axis(i) for i in range(joystick.get_numaxes())]
+            buttons = [joystick.get_button(i) for i in range(joystick.get_numbuttons())]
+            hats = [joystick.get_hat(i) for i in range(joystick.get_numhats())]
+
+            # Check for button presses (edge detection)
+            if prev_buttons is not None and len(buttons) > 0:
+                a_button = buttons[0] if len(buttons) > 0 else False
+                b_button = buttons[1] if len(buttons) > 1 else False
+                if len(buttons) > 14:
+                    joystick_button = buttons[13]
+                elif len(buttons) > 9:
+                    joystick_button = buttons[8]
+                else:
+                    joystick_button = False
+
+                prev_a_button = prev_buttons[0] if len(prev_buttons) > 0 else False
+                prev_b_button = prev_buttons[1] if len(prev_buttons) > 1 else False
+                if len(prev_buttons) > 14:
+                    prev_joystick_button = prev_buttons[13]
+                elif len(prev_buttons) > 9:
+                    prev_joystick_button = prev_buttons[8]
+                else:
+                    prev_joystick_button = False
+
+                # B button pressed (Connect) - transition from not pressed to pressed
+                if b_button and not prev_b_button:
+                    print("B button pressed - triggering Connect")
+                    gui_action("connect")
+
+                # A button pressed (Disconnect) - transition from not pressed to pressed
+                if a_button and not prev_a_button:
+                    print("A button pressed - triggering Disconnect")
+                    gui_action("disconnect")
+
+                # Joystick button pressed (toggle Joystick mode)
+                if joystick_button and not prev_joystick_button:
+                    print("Joystick button pressed - toggling mode")
+                    gui_action("toggle_mode")
+
+            # Check for hat up/down presses (edge detection)
+            if prev_hats is not None and len(hats) > 0:
+                # Hat values are tuples (x, y) where y: -1 (down), 0 (neutral), 1 (up)
+                current_hat = hats[0] if len(hats) > 0 else (0, 0)
+                prev_hat = prev_hats[0] if len(prev_hats) > 0 else (0, 0)
+
+                current_y = current_hat[1] if len(current_hat) > 1 else 0
+                prev_y = prev_hat[1] if len(prev_hat) > 1 else 0
+
+                # Hat up pressed (y changed from 0 or -1 to 1)
+                if current_y == 1 and prev_y != 1:
+                    print("Hat up pressed - moving selection up")
+                    gui_action("select_up")
+
+                # Hat down pressed (y changed from 0 or 1 to -1)
+                if current_y == -1 and prev_y != -1:
+                    print("Hat down pressed - moving selection down")
+                    gui_action("select_down")
+
+            # Update previous button and hat states
+            prev_buttons = buttons.copy() if buttons else None
+            prev_hats = hats.copy() if hats else None
+
+            values = [int(axes[i] * 512) for i in range(6)]
+            if values != prev_values:
+                prev_values = values
+                loop.call_soon_threadsafe(on_joystick_values, values)
+
+        next_sample += period
+        delay = next_sample - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # Fell behind; sample again now rather than in a burst
+            next_sample = time.monotonic()
+
+def on_joystick_values(values):
+    """Asyncio thread: store a new joystick sample and wake the sender."""
+    global current_slider_values
+    with slider_values_lock:
+        current_slider_values = values
+    slider_values_changed.set()
 
 def run_gui():
     """Run the tkinter GUI in a separate thread"""
@@ -124,14 +370,19 @@ def run_gui():
         if not to_uid:
             print(f"Connect pressed but no valid head selected: {selected!r}")
             return
-        gui_to_async_queue.put({"type": "CONNECT", "to_uid": to_uid})
+        gui_bridge.to_async({"type": "CONNECT", "to_uid": to_uid})
 
     connect_button = ttk.Button(heads_frame, text="Connect", command=on_connect_pressed)
     connect_button.pack(side=tk.LEFT, padx=5)
 
     def on_disconnect_pressed():
         # GUI thread only: enqueue an event for asyncio thread to handle.
-        gui_to_async_queue.put({"type": "DISCONNECT"})
+        selected = heads_dropdown.get()
+        to_uid = _extract_uid_from_dropdown_value(selected)
+        if not to_uid:
+            print(f"Disconnect pressed but no valid head selected: {selected!r}")
+            return
+        gui_bridge.to_async({"type": "DISCONNECT", "to_uid": to_uid})
 
     disconnect_button = ttk.Button(heads_frame, text="Disconnect", command=on_disconnect_pressed)
     disconnect_button.pack(side=tk.LEFT, padx=5)
@@ -142,7 +393,13 @@ def run_gui():
         uid = _extract_uid_from_dropdown_value(selected)
         global selected_head_uid
         with selected_head_uid_lock:
+            changed = uid != selected_head_uid
             selected_head_uid = uid
+        if changed:
+            # Telemetry lines follow the selected head
+            telemetry_var.set("")
+            lens_var.set("")
+            sled_var.set("")
 
     def update_dropdown(heads):
         heads = heads or []
@@ -165,8 +422,63 @@ def run_gui():
                 global selected_head_uid
                 selected_head_uid = None
     
+    def on_head_selected():
+        """The operator picked a head: show it, and drive it if only one head is driven."""
+        update_selected_head_uid()
+        with selected_head_uid_lock:
+            uid = selected_head_uid
+        if uid:
+            gui_bridge.to_async({"type": "SELECT_HEAD", "uid": uid})
+
     # Bind dropdown selection change event
-    heads_dropdown.bind("<<ComboboxSelected>>", lambda e: update_selected_head_uid())
+    heads_dropdown.bind("<<ComboboxSelected>>", lambda e: on_head_selected())
+
+    # Connected heads; ticked heads are driven by the joystick and mode buttons
+    pool_frame = ttk.Frame(root)
+    pool_frame.pack(side=tk.TOP, fill=tk.X, padx=10)
+    pool_rows = ttk.Frame(pool_frame)
+    pool_rows.pack(side=tk.TOP, fill=tk.X)
+
+    group_frame = ttk.Frame(pool_frame)
+    group_frame.pack(side=tk.TOP, fill=tk.X, pady=5)
+    ttk.Label(group_frame, text="Group:").pack(side=tk.LEFT, padx=5)
+    groups_dropdown = ttk.Combobox(group_frame, width=20)
+    groups_dropdown.pack(side=tk.LEFT, padx=5)
+
+    def on_drive_group_pressed():
+        name = groups_dropdown.get().strip()
+        if name:
+            gui_bridge.to_async({"type": "ACTIVATE_GROUP", "name": name})
+
+    def on_save_group_pressed():
+        name = groups_dropdown.get().strip()
+        if name:
+            gui_bridge.to_async({"type": "SAVE_GROUP", "name": name})
+
+    ttk.Button(group_frame, text="Drive group", command=on_drive_group_pressed).pack(side=tk.LEFT, padx=5)
+    ttk.Button(group_frame, text="Save ticked as group", command=on_save_group_pressed).pack(side=tk.LEFT, padx=5)
+
+    def update_pool(heads, groups):
+        for child in pool_rows.winfo_children():
+            child.destroy()
+        for head in heads:
+            uid = head["uid"]
+            var = tk.BooleanVar(value=head["active"])
+            ttk.Checkbutton(
+                pool_rows, variable=var,
+                text=f"{head['name']} ({uid}): {head['state']}",
+                command=lambda uid=uid, var=var: gui_bridge.to_async(
+                    {"type": "SET_ACTIVE", "uid": uid, "active": var.get()}),
+            ).pack(side=tk.TOP, anchor=tk.W)
+        groups_dropdown["values"] = groups
+
+    # Live telemetry from the head selected in the dropdown
+    telemetry_var = tk.StringVar(value="")
+    ttk.Label(root, textvariable=telemetry_var, font=("TkFixedFont",)).pack(side=tk.TOP, fill=tk.X, padx=10)
+    lens_var = tk.StringVar(value="")
+    ttk.Label(root, textvariable=lens_var, font=("TkFixedFont",)).pack(side=tk.TOP, fill=tk.X, padx=10)
+    sled_var = tk.StringVar(value="")
+    ttk.Label(root, textvariable=sled_var, font=("TkFixedFont",)).pack(side=tk.TOP, fill=tk.X, padx=10)
 
     # Mode buttons panel (only visible when a UDP connection is active)
     mode_frame = ttk.Frame(root)
@@ -186,7 +498,7 @@ def run_gui():
             # Switching to joystick - save current mode as previous
             previous_mode = current_mode
         current_mode = mode
-        gui_to_async_queue.put({"type": "SET_MODE", "mode": mode})
+        gui_bridge.to_async({"type": "SET_MODE", "mode": mode})
 
     auto_cam_button = ttk.Button(mode_frame, text="Auto-cam", command=lambda: on_mode_pressed("auto_cam"))
     joystick_button = ttk.Button(mode_frame, text="Joystick", command=lambda: on_mode_pressed("joystick"))
@@ -207,43 +519,37 @@ def run_gui():
             mode_frame.pack_forget()
             mode_panel_visible = False
 
-    def process_async_to_gui_events():
+    def on_async_event(event):
         # GUI thread: apply state changes driven by asyncio thread events.
-        try:
-            while True:
-                event = async_to_gui_queue.get_nowait()
-                if isinstance(event, dict) and event.get("type") == "UDP_CONNECTION_STATE":
-                    nonlocal connected, current_mode
-                    connected = bool(event.get("connected"))
-                    set_mode_panel_visible(connected)
-                    if not connected:
-                        current_mode = None
-                elif isinstance(event, dict) and event.get("type") == "HEADS_LIST":
-                    update_dropdown(event.get("heads", []))
-        except queue.Empty:
-            pass
-        root.after(100, process_async_to_gui_events)
-
-    # Start processing asyncio->GUI events
-    root.after(100, process_async_to_gui_events)
+        if isinstance(event, dict) and event.get("type") in ("GIMBAL_TELEMETRY", "LENS_TELEMETRY", "SLED_TELEMETRY"):
+            with selected_head_uid_lock:
+                shown_uid = selected_head_uid
+            if event.get("uid") != shown_uid:
+                return
+        if isinstance(event, dict) and event.get("type") == "HEAD_POOL_STATE":
+            nonlocal connected, current_mode
+            update_pool(event.get("heads", []), event.get("groups", []))
+            connected = any(head["state"] == "connected" for head in event.get("heads", []))
+            set_mode_panel_visible(connected)
+            if not connected:
+                current_mode = None
+                telemetry_var.set("")
+                lens_var.set("")
+                sled_var.set("")
+        elif isinstance(event, dict) and event.get("type") == "GIMBAL_TELEMETRY":
+            telemetry_var.set(format_gimbal_telemetry(event))
+        elif isinstance(event, dict) and event.get("type") == "LENS_TELEMETRY":
+            lens_var.set(format_lens_telemetry(event))
+        elif isinstance(event, dict) and event.get("type") == "SLED_TELEMETRY":
+            sled_var.set(format_sled_telemetry(event))
+        elif isinstance(event, dict) and event.get("type") == "HEADS_LIST":
+            update_dropdown(event.get("heads", []))
+        elif isinstance(event, dict) and event.get("type") == "JOYSTICK_ACTION":
+            on_joystick_action(event.get("action"))
+
+    # Start receiving asyncio->GUI events
+    gui_bridge.attach_gui(root, on_async_event)
        
-    joysticks = []
-    try:
-        import pygame
-        pygame.init()
-        pygame.joystick.init()
-        for i in range(pygame.joystick.get_count()):
-            js = pygame.joystick.Joystick(i)
-            js.init()
-            print(f"Joystick {i} name: {js.get_name()} axes: {js.get_numaxes()} hats: {js.get_numhats()} buttons: {js.get_numbuttons()}")
-            joysticks.append(js)
-    except Exception as e:
-        print("Joystick init failed:", e)
-
-    # Track previous button states for edge detection
-    prev_buttons = None
-    prev_hats = None
-    
     def change_dropdown_selection(direction):
         """Change dropdown selection up (-1) or down (+1)"""
         values = heads_dropdown["values"]
@@ -266,111 +572,36 @@ def run_gui():
         
         heads_dropdown.set(values[new_index])
         print(f"Changed head selection to: {values[new_index]}")
+        on_head_selected()
     
-    def poll_joystick():
-        pygame.event.pump()
-        global joystick, prev_buttons, prev_hats
-        if not joystick:
-            for j in joysticks:
-                buttons = [j.get_button(i) for i in range(j.get_numbuttons())]
-
-                lb_button = buttons[4] or buttons[6]
-                rb_button = buttons[5] or buttons[7]
-
-                if lb_button and rb_button:
-                    joystick = j
-                    print(f"Selected joystick name: {joystick.get_name()}")
-                    prev_buttons = None  # Reset previous button states when joystick is selected
-                    prev_hats = None  # Reset previous hat states when joystick is selected
-                    break
-
+    def toggle_joystick_mode():
+        """Joystick button: switch to Joystick mode, or back to the mode used before it."""
+        if current_mode == "joystick":
+            # Currently in joystick mode, switch back to previous mode
+            if previous_mode:
+                print(f"Switching back to previous mode: {previous_mode}")
+                on_mode_pressed(previous_mode)
+            else:
+                # No previous mode, default to auto_cam
+                print("No previous mode, defaulting to auto_cam")
+                on_mode_pressed("auto_cam")
         else:
-            axes = [joystick.get_axis(i) for i in range(joystick.get_numaxes())]
-            buttons = [joystick.get_button(i) for i in range(joystick.get_numbuttons())]
-            hats = [joystick.get_hat(i) for i in range(joystick.get_numhats())]
-            # print("Axes:", ["{:+.2f}".format(a) for a in axes],
-            #       "Buttons:", buttons,
-            #       "Hats:", hats)
-
-            # Check for button presses (edge detection)
-            if prev_buttons is not None and len(buttons) > 0:
-                a_button = buttons[0] if len(buttons) > 0 else False
-                b_button = buttons[1] if len(buttons) > 1 else False
-                if len(buttons) > 14:
-                    joystick_button = buttons[13]
-                elif len(buttons) > 9:
-                    joystick_button = buttons[8]
-                else:
-                    joystick_button = False
-
-                prev_a_button = prev_buttons[0] if len(prev_buttons) > 0 else False
-                prev_b_button = prev_buttons[1] if len(prev_buttons) > 1 else False
-                if len(prev_buttons) > 14:
-                    prev_joystick_button = prev_buttons[13]
-                elif len(prev_buttons) > 9:
-                    prev_joystick_button = prev_buttons[8]
-                else:
-                    prev_joystick_button = False
-
-                # B button pressed (Connect) - transition from not pressed to pressed
-                if b_button and not prev_b_button:
-                    print("B button pressed - triggering Connect")
-                    on_connect_pressed()
-                
-                # A button pressed (Disconnect) - transition from not pressed to pressed
-                if a_button and not prev_a_button:
-                    print("A button pressed - triggering Disconnect")
-                    on_disconnect_pressed()
-                
-                # Joystick button pressed (toggle Joystick mode)
-                if joystick_button and not prev_joystick_button:
-                    print("Joystick button pressed - toggling mode")
-                    nonlocal current_mode, previous_mode
-                    if current_mode == "joystick":
-                        # Currently in joystick mode, switch back to previous mode
-                        if previous_mode:
-                            print(f"Switching back to previous mode: {previous_mode}")
-                            on_mode_pressed(previous_mode)
-                        else:
-                            # No previous mode, default to auto_cam
-                            print("No previous mode, defaulting to auto_cam")
-                            on_mode_pressed("auto_cam")
-                    else:
-                        # Not in joystick mode, switch to joystick
-                        print("Switching to joystick mode")
-                        on_mode_pressed("joystick")
-            
-            # Check for hat up/down presses (edge detection)
-            if prev_hats is not None and len(hats) > 0:
-                # Hat values are tuples (x, y) where y: -1 (down), 0 (neutral), 1 (up)
-                current_hat = hats[0] if len(hats) > 0 else (0, 0)
-                prev_hat = prev_hats[0] if len(prev_hats) > 0 else (0, 0)
-                
-                current_y = current_hat[1] if len(current_hat) > 1 else 0
-                prev_y = prev_hat[1] if len(prev_hat) > 1 else 0
-                
-                # Hat up pressed (y changed from 0 or -1 to 1)
-                if current_y == 1 and prev_y != 1:
-                    print("Hat up pressed - moving selection up")
-                    change_dropdown_selection(-1)
-                
-                # Hat down pressed (y changed from 0 or 1 to -1)
-                if current_y == -1 and prev_y != -1:
-                    print("Hat down pressed - moving selection down")
-                    change_dropdown_selection(1)
-            
-            # Update previous button and hat states
-            prev_buttons = buttons.copy() if buttons else None
-            prev_hats = hats.copy() if hats else None
-
-            global current_slider_values
-            with slider_values_lock:
-                current_slider_values = [int(axes[i] * 512) for i in range(6)]
-
-        # Re-schedule for continuous polling inside Tkinter loop
-        root.after(50, poll_joystick)
-
-    root.after(50, poll_joystick)
+            # Not in joystick mode, switch to joystick
+            print("Switching to joystick mode")
+            on_mode_pressed("joystick")
+
+    def on_joystick_action(action):
+        # Button and hat presses detected by the joystick input thread
+        if action == "connect":
+            on_connect_pressed()
+        elif action == "disconnect":
+            on_disconnect_pressed()
+        elif action == "toggle_mode":
+            toggle_joystick_mode()
+        elif action == "select_up":
+            change_dropdown_selection(-1)
+        elif action == "select_down":
+            change_dropdown_selection(1)
 
     root.mainloop()
 
@@ -380,17 +611,28 @@ pending_udp_connections = {}  # Store pending UDP connection info: peer_uid -> {
 reliable_channel = None  # Store the reliable channel for sending UDP messages
 current_slider_values = [0] * 6  # Store current slider values (thread-safe access needed)
 slider_values_lock = threading.Lock()  # Lock for thread-safe access to slider values
+slider_values_changed = asyncio.Event()  # Set by on_joystick_values() when a new sample arrives
+JOYSTICK_HZ = 250      # Joystick sampling rate of the input thread
+CONTROL_DELTA = True   # Send only changed axes plus a full-frame heartbeat; False sends every frame in full
+CONTROL_SEND_S = 0.05  # With no new input: full-frame interval, or how often a heartbeat is checked for in delta mode
+CONTROL_MIN_S = 0.01   # Rate cap: minimum time between frames sent for new input
+STANDBY_MAX = 8        # Most head connections held at once, driven or standby
+CONNECT_TIMEOUT_S = 10  # An OFFER unanswered for this long no longer counts towards STANDBY_MAX
 heads_list = []  # Store current heads list
 heads_list_lock = threading.Lock()  # Lock for thread-safe access to heads list
 heads_dropdown = None  # Reference to the dropdown widget
-gui_to_async_queue = queue.Queue()  # Queue for passing GUI events to asyncio thread (thread-safe)
-async_to_gui_queue = queue.Queue()  # Queue for passing asyncio events to GUI thread (thread-safe)
-current_udp_connection = None  # Currently active UDPConnection (if any)
+gui_bridge = GuiBridge()  # Passes events between the GUI thread and the asyncio thread
 selected_head_uid = None  # Currently selected head UID from dropdown
 selected_head_uid_lock = threading.Lock()  # Lock for thread-safe access to selected head UID
 com_port_bgc = None
 com_port_camera = None
 com_port_lock = threading.Lock()  # Lock for thread-safe access to COM ports
+COM_READ_CHUNK = 256   # Max bytes taken from the COM port per read
+COM_IDLE_MS = 5        # Inter-byte gap that ends a read; a partial frame is then sent anyway
+COM_REROUTE = False    # Pass frames written to the wrong port on to the other target instead of dropping them
+TCP_SERIAL_HOST = "127.0.0.1"  # Interface the TCP serial endpoints listen on
+TCP_SERIAL_PORTS = {"bgc": 8081, "camera": 8082}  # Endpoints that follow the selected head
+TCP_SERIAL_HEAD_PORT = 8100    # Per-head endpoints: bgc on an even port, camera on the next one
 
 def http_to_ws_url(http_url):
     """Convert HTTP URL to WebSocket URL for upgrading the connection"""
@@ -408,13 +650,69 @@ def get_manifest():
     return manifest
 
 async def send_slider_values(channel):
+    """
+    Send a frame to channel (a HeadPool fans it out) as soon as the joystick
+    moves, at most every CONTROL_MIN_S, and at least every CONTROL_SEND_S.
+    """
+    encoder = control_packet.DeltaEncoder() if CONTROL_DELTA else None
+    version = getattr(channel, "version", None)
+    last_sent = 0.0
     while True:
-        global current_slider_values
+        try:
+            await asyncio.wait_for(slider_values_changed.wait(), CONTROL_SEND_S)
+        except asyncio.TimeoutError:
+            pass
+        # Samples arriving during the rate-cap wait are folded into this frame
+        delay = last_sent + CONTROL_MIN_S - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        slider_values_changed.clear()
+        if encoder and getattr(channel, "version", None) != version:
+            # A head joined the stream; start it from a full frame
+            version = channel.version
+            encoder.reset()
         if channel:
             with slider_values_lock:
                 values = current_slider_values.copy()
-            await send_udp_message(values, channel)
-        await asyncio.sleep(0.05)  # 50ms interval, same as original update_values
+            await send_udp_message(values, channel, encoder)
+        last_sent = time.monotonic()
+
+async def _send_com_frames(router, head_uid=None, port_name=None):
+    """
+    Send the router's complete frames to head_uid (default: the selected head),
+    one COM_DATA message per target, and log anything it dropped.
+    """
+    if port_name:
+        line = router.report(port_name, time.monotonic())
+        if line:
+            print(line)
+    for target in (router.target, router.other):
+        data = router.take(target)
+        if data:
+            await _send_com_data(target, data, head_uid)
+
+async def _send_com_data(target: str, data: bytes, head_uid=None):
+    if head_uid is None:
+        with selected_head_uid_lock:
+            head_uid = selected_head_uid
+
+    # Only forward if a head is selected and websocket is available
+    if head_uid and ws:
+        # Encode data as base64 for JSON transport
+        data_b64 = base64.b64encode(data).decode('utf-8')
+
+        # Send to head via websocket
+        msg = {
+            "type": "COM_DATA",
+            "target": target,
+            "to_uid": head_uid,
+            "from_uid": uid_hex,
+            "data": data_b64
+        }
+        try:
+            await ws.send(json.dumps(msg))
+        except Exception as e:
+            print(f"Error sending COM data to head {head_uid}: {e}")
 
 async def _com_port_forwarding_task(port_name: str, target: str):
     """Read from a local COM port and forward to selected head via websocket as COM_DATA."""
@@ -426,52 +724,31 @@ async def _com_port_forwarding_task(port_name: str, target: str):
     
     BAUD_RATE = 115200  # Standard baud rate, but doesn't matter for virtual port
     
+    service = None
     try:
-        # Open COM port
-        ser = serial.Serial(port_name, BAUD_RATE, timeout=0, write_timeout=1)
+        # Open COM port; its reader and writer threads do the blocking I/O
+        ser = serial.Serial(port_name, BAUD_RATE, write_timeout=1)
+        service = SerialService(ser, read_chunk=COM_READ_CHUNK, idle_s=COM_IDLE_MS / 1000.0).start()
+        router = ComRouter(target, reroute=COM_REROUTE)
         print(f"COM port {port_name} opened for target={target}")
         
         with com_port_lock:
             if target == "camera":
-                com_port_camera = ser
+                com_port_camera = service
             else:
-                com_port_bgc = ser
+                com_port_bgc = service
         
         while True:
-            try:
-                # Read from COM port (blocking, so use to_thread)
-                data = await asyncio.to_thread(ser.read, 64)
-                
-                if data and len(data) > 0:
-                    # Get selected head UID
-                    with selected_head_uid_lock:
-                        head_uid = selected_head_uid
-                    
-                    # Only forward if a head is selected and websocket is available
-                    if head_uid and ws:
-                        # Encode data as base64 for JSON transport
-                        data_b64 = base64.b64encode(data).decode('utf-8')
-                        
-                        # Send to head via websocket
-                        msg = {
-                            "type": "COM_DATA",
-                            "target": target,
-                            "to_uid": head_uid,
-                            "from_uid": uid_hex,
-                            "data": data_b64
-                        }
-                        #print(f"Sending COM data to head {head_uid}: {msg}")
-                        try:
-                            await ws.send(json.dumps(msg))
-                        except Exception as e:
-                            print(f"Error sending COM data to head {head_uid}: {e}")
-                
-                # Small delay to prevent busy loop
-                await asyncio.sleep(0.0)
-                
-            except Exception as e:
-                print(f"Error reading from COM port: {e}")
-                await asyncio.sleep(0.1)
+            data, idle = await service.get()
+            if data is None:
+                # Read error: drop the partial frame, the reader retries
+                router.reset()
+                continue
+            router.feed(data)
+            if idle:
+                # Line went idle mid-frame: the rest isn't coming
+                router.idle()
+            await _send_com_frames(router, port_name=port_name)
                 
     except serial.SerialException as e:
         print(f"Error opening COM port {port_name}: {e}")
@@ -479,82 +756,398 @@ async def _com_port_forwarding_task(port_name: str, target: str):
         print(f"Error in COM port forwarding task: {e}")
     finally:
         with com_port_lock:
-            port_ref = com_port_camera if target == "camera" else com_port_bgc
-            if port_ref:
-                try:
-                    port_ref.close()
-                except:
-                    pass
-                if target == "camera":
-                    com_port_camera = None
-                else:
-                    com_port_bgc = None
+            if target == "camera":
+                com_port_camera = None
+            else:
+                com_port_bgc = None
+        if service:
+            service.close()
         print(f"COM port {port_name} closed for target={target}")
 
 async def write_to_com_port(target: str, data: bytes):
-    """Write data to a local COM port based on target (called from websocket message handler)."""
+    """Queue data for a local COM port based on target (called from websocket message handler)."""
     global com_port_bgc, com_port_camera
     
     with com_port_lock:
-        port = com_port_camera if target == "camera" else com_port_bgc
+        service = com_port_camera if target == "camera" else com_port_bgc
     
-    if port and port.is_open:
+    if service:
+        service.write(data)
+
+class TcpSerialBridge:
+    """
+    TCP endpoints onto the COM_DATA tunnel, so a tool such as SimpleBGC GUI
+    can connect straight to a head instead of going through a com0com pair,
+    com2tcp and a local COM port forwarding task.
+
+    TCP_SERIAL_PORTS follow the selected head. Every head in HEADS_LIST also
+    gets a pair of its own from TCP_SERIAL_HEAD_PORT (bgc, then camera),
+    kept in the registry as tcp_serial_ports so a tool's saved settings stay
+    valid. A client whose first byte is IAC is spoken to as RFC 2217
+    (rfc2217://); anything else is a raw byte stream.
+    """
+
+    def __init__(self):
+        self.servers = {}   # (uid, target) -> asyncio.Server; uid None follows the selected head
+        self.clients = {}   # (uid, target) -> {StreamWriter: Rfc2217Codec or None}
+        self.ports = {}     # uid -> its bgc port; camera is the next one
+
+    def load_ports(self):
+        if ota_present:
+            self.ports = dict(ota.registry_get('tcp_serial_ports', {}))
+
+    async def start(self):
+        for target, port in TCP_SERIAL_PORTS.items():
+            await self._listen(None, target, port)
+
+    async def add_heads(self, uids):
+        """Give each head its own endpoints, reusing the ports it had before."""
+        changed = False
+        for uid in uids:
+            if uid not in self.ports:
+                used = set(self.ports.values())
+                port = TCP_SERIAL_HEAD_PORT
+                while port in used:
+                    port += 2
+                self.ports[uid] = port
+                changed = True
+            await self._listen(uid, "bgc", self.ports[uid])
+            await self._listen(uid, "camera", self.ports[uid] + 1)
+        if changed and ota_present:
+            ota.registry_set('tcp_serial_ports', self.ports)
+
+    async def _listen(self, uid, target, port):
+        key = (uid, target)
+        if key in self.servers:
+            return
         try:
-            await asyncio.to_thread(port.write, data)
-            await asyncio.to_thread(port.flush)
-        except Exception as e:
-            print(f"Error writing to COM port: {e}")
+            self.servers[key] = await asyncio.start_server(
+                lambda reader, writer: self._serve(key, reader, writer), TCP_SERIAL_HOST, port)
+            print(f"TCP serial endpoint {TCP_SERIAL_HOST}:{port} -> {uid or 'selected head'} {target}")
+        except OSError as e:
+            print(f"Error opening TCP serial endpoint on port {port}: {e}")
+
+    async def _serve(self, key, reader, writer):
+        uid, target = key
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        port = writer.get_extra_info("sockname")[1]
+        router = ComRouter(target, reroute=COM_REROUTE)
+        clients = self.clients.setdefault(key, {})
+        clients[writer] = None
+        codec = None
+        first = True
+        try:
+            while True:
+                try:
+                    if router.pending():
+                        data = await asyncio.wait_for(reader.read(COM_READ_CHUNK), COM_IDLE_MS / 1000.0)
+                    else:
+                        data = await reader.read(COM_READ_CHUNK)
+                except asyncio.TimeoutError:
+                    # Client went quiet mid-frame: the rest isn't coming
+                    router.idle()
+                    await _send_com_frames(router, uid, f"TCP {port}")
+                    continue
+                if not data:
+                    break
+                if first:
+                    first = False
+                    if data[0] == IAC:
+                        codec = Rfc2217Codec()
+                        clients[writer] = codec
+                        writer.write(codec.greeting())
+                if codec:
+                    data, replies = codec.decode(data)
+                    if replies:
+                        writer.write(replies)
+                router.feed(data)
+                await _send_com_frames(router, uid, f"TCP {port}")
+        except (ConnectionError, OSError) as e:
+            print(f"TCP serial client error on {target}: {e}")
+        finally:
+            clients.pop(writer, None)
+            writer.close()
+
+    def deliver(self, from_uid, target, data):
+        """Pass COM_DATA from a head to the clients of its endpoints."""
+        with selected_head_uid_lock:
+            selected = selected_head_uid
+        keys = [(from_uid, target)]
+        if from_uid == selected:
+            keys.append((None, target))
+        for key in keys:
+            for writer, codec in list(self.clients.get(key, {}).items()):
+                try:
+                    writer.write(codec.encode(data) if codec else data)
+                except Exception as e:
+                    print(f"Error writing to TCP serial client: {e}")
+
+tcp_serial = TcpSerialBridge()
 
 async def onOpen(connection):
-    print("Connection opened (onOpen callback)")
-    global current_udp_connection
-    current_udp_connection = connection
-    async_to_gui_queue.put({"type": "UDP_CONNECTION_STATE", "connected": True})
-    
-    # Access channels from connection
-    global unreliable_channel
-    unreliable_channel = connection.unreliable_channel
+    print(f"Connection to {connection.peer_uid} opened (onOpen callback)")
+    await head_pool.on_open(connection)
 
 async def onClose(connection):
-    print("Connection closed (onClose callback)")
-    # Kill slider_send task
-    if connection and hasattr(connection, '_slider_send_task') and connection._slider_send_task:
-        connection._slider_send_task.cancel()
-        try:
-            await connection._slider_send_task
-        except asyncio.CancelledError:
-            pass
-    global unreliable_channel
-    unreliable_channel = None
-    global current_udp_connection
-    if current_udp_connection is connection:
-        current_udp_connection = None
-    async_to_gui_queue.put({"type": "UDP_CONNECTION_STATE", "connected": False})
-
-async def _start_slider_send_task_if_needed(connection):
-    """Start the continuous slider streaming task (Joystick mode) if it's not already running."""
-    if not connection:
+    print(f"Connection to {connection.peer_uid} closed (onClose callback)")
+    await head_pool.on_close(connection)
+
+async def on_unreliable_message(data, uid=None):
+    """Decode telemetry streamed back by head uid and pass it on to the GUI."""
+    if len(data) < 2 or data[0] != TELEMETRY_HEADER:
         return
-    existing = getattr(connection, "_slider_send_task", None)
-    if existing and not existing.done():
+    if data[1] == TELEMETRY_LENS and len(data) == LENS_TELEMETRY_SIZE:
+        _, _, zoom, focus, iris, flags = struct.unpack(LENS_TELEMETRY_FORMAT, data)
+        gui_bridge.to_gui({
+            "type": "LENS_TELEMETRY",
+            "uid": uid,
+            "zoom": zoom if flags & 0x01 else None,
+            "focus": focus if flags & 0x02 else None,
+            "iris": iris if flags & 0x04 else None,
+        })
         return
-    task = asyncio.create_task(send_slider_values(connection.unreliable_channel))
-    connection._slider_send_task = task
-
-async def _stop_slider_send_task_if_running(connection):
-    """Stop the continuous slider streaming task if running."""
-    if not connection:
+    if data[1] == TELEMETRY_SLED and len(data) >= SLED_BATCH_SIZE:
+        _, _, count = struct.unpack_from(SLED_BATCH_FORMAT, data)
+        if not count or len(data) != SLED_BATCH_SIZE + count * SLED_SAMPLE_SIZE:
+            return
+        samples = [struct.unpack_from(SLED_SAMPLE_FORMAT, data, SLED_BATCH_SIZE + i * SLED_SAMPLE_SIZE)
+                   for i in range(count)]
+        timestamp_ms, pos, vel, iq, errors = samples[-1]
+        # The GUI shows the newest sample; the batch adds the peak current and any error seen
+        for sample in samples[:-1]:
+            errors |= sample[4]
+        gui_bridge.to_gui({
+            "type": "SLED_TELEMETRY",
+            "uid": uid,
+            "timestamp_ms": timestamp_ms,
+            "pos": pos,
+            "vel": vel,
+            "iq": iq,
+            "iq_peak": max(abs(sample[3]) for sample in samples),
+            "errors": errors,
+        })
         return
-    task = getattr(connection, "_slider_send_task", None)
-    if not task:
+    if len(data) != TELEMETRY_SIZE or data[1] != TELEMETRY_GIMBAL:
         return
-    if not task.done():
-        task.cancel()
-        try:
-            await task
-        except asyncio.CancelledError:
-            pass
+    (_, _, timestamp_ms, flags,
+     imu_roll, imu_pitch, imu_yaw, target_roll, target_pitch, target_yaw,
+     system_error, bat_level, power_roll, power_pitch, power_yaw) = struct.unpack(TELEMETRY_FORMAT, data)
+    gui_bridge.to_gui({
+        "type": "GIMBAL_TELEMETRY",
+        "uid": uid,
+        "timestamp_ms": timestamp_ms,
+        "angles": (imu_roll * ANGLE_UNIT, imu_pitch * ANGLE_UNIT, imu_yaw * ANGLE_UNIT),
+        "target_angles": (target_roll * ANGLE_UNIT, target_pitch * ANGLE_UNIT, target_yaw * ANGLE_UNIT),
+        "motors_on": bool(flags & TELEMETRY_MOTORS_ON),
+        "state_valid": bool(flags & TELEMETRY_STATE_VALID),
+        "system_error": system_error,
+        "bat_level": bat_level,
+        "motor_power": (power_roll, power_pitch, power_yaw),
+    })
+
+class HeadPool:
+    """
+    UDP connections to any number of heads, keyed by uid. Mode changes and
+    the joystick stream go to the heads in the active group: the stream is
+    encoded once per frame and sent to all of them together (send()).
+    Named groups are kept in the registry as head_groups.
+
+    Every head in HEADS_LIST, up to STANDBY_MAX, is also kept connected as
+    an idle hot standby (see prewarm()), so driving another head is just a
+    change of the active set.
+    """
+
+    def __init__(self):
+        self.connections = {}   # uid -> open UDPConnection
+        self.connecting = {}    # uid -> time.monotonic() its OFFER was sent
+        self.active = set()     # uids driven by the joystick and mode buttons
+        self.groups = {}        # group name -> list of uids
+        self.mode = None
+        self.version = 0        # bumped whenever the set of heads being driven changes
+        self._send_task = None
+
+    def load_groups(self):
+        if ota_present:
+            self.groups = dict(ota.registry_get('head_groups', {}))
+
+    def save_group(self, name):
+        """Store the active heads as group name."""
+        self.groups[name] = sorted(self.active)
+        if ota_present:
+            ota.registry_set('head_groups', self.groups)
+        self.publish()
+
+    def driven(self):
+        return [self.connections[uid] for uid in sorted(self.active) if uid in self.connections]
+
+    async def send(self, data):
+        """Send one unreliable message to every driven head at once."""
+        channels = [connection.unreliable_channel for connection in self.driven()]
+        if channels:
+            await asyncio.gather(*(channel.send(data) for channel in channels), return_exceptions=True)
+
+    async def _send_mode(self, connections):
+        msg = json.dumps({"type": "SET_MODE", "mode": self.mode}).encode("utf-8")
+        channels = [c.reliable_channel for c in connections if getattr(c, "reliable_channel", None)]
+        await asyncio.gather(*(channel.send(msg) for channel in channels), return_exceptions=True)
+
+    def _changed(self):
+        self.version += 1
+        for uid, connection in self.connections.items():
+            connection.set_idle(uid not in self.active)
+        self.publish()
+
+    async def connect(self, uid, drive=True):
+        """Connect to uid, if not already connected or connecting, and drive it unless drive is False."""
+        if drive:
+            self.active.add(uid)
+        if uid not in self.connections and uid not in self.connecting:
+            self.connecting[uid] = time.monotonic()
+            if not await init_udp_connection(uid):
+                self.connecting.pop(uid, None)
+        self._changed()
+
+    def _abandon_offer(self, uid):
+        """Stop waiting for uid's ANSWER and close the socket gathered for it."""
+        self.connecting.pop(uid, None)
+        pending = pending_udp_connections.pop(uid, None)
+        if pending:
+            pending["socket"].close()
+
+    async def disconnect(self, uid):
+        self.active.discard(uid)
+        self._abandon_offer(uid)
+        connection = self.connections.get(uid)
+        if connection:
+            await connection.close()
+        self._changed()
+
+    async def set_active(self, uid, active):
+        if active:
+            await self.connect(uid)
+            connection = self.connections.get(uid)
+            if connection and self.mode:
+                await self._send_mode([connection])
+        else:
+            self.active.discard(uid)
+            self._changed()
+
+    async def prewarm(self, uids):
+        """
+        Hold idle standby connections to uids (in order of preference), up to
+        STANDBY_MAX in all. Standby heads no longer in uids are dropped first,
+        so their slots go to heads that have come online since.
+        """
+        keep = set(uids) | self.active
+        dropped = False
+        for uid in [uid for uid in self.connecting if uid not in keep]:
+            self._abandon_offer(uid)
+            dropped = True
+        for uid, connection in list(self.connections.items()):
+            if uid not in keep:
+                del self.connections[uid]
+                await connection.close()
+                dropped = True
+        if dropped:
+            self._changed()
+        now = time.monotonic()
+        for uid, started in list(self.connecting.items()):
+            if now - started > CONNECT_TIMEOUT_S:
+                # No ANSWER; free the slot and try again
+                self._abandon_offer(uid)
+        for uid in uids:
+            if len(self.connections) + len(self.connecting) >= STANDBY_MAX:
+                break
+            if uid not in self.connections and uid not in self.connecting:
+                await self.connect(uid, drive=False)
+
+    async def select(self, uid):
+        """
+        The operator selected uid. When at most one head is being driven, drive
+        uid instead; its standby connection makes this immediate. A multi-head
+        group is left alone, and the selection only changes which head's
+        telemetry is shown.
+        """
+        if len(self.active) > 1 or self.active == {uid}:
+            return
+        self.active = set()
+        await self.connect(uid)
+        connection = self.connections.get(uid)
+        if connection and self.mode:
+            await self._send_mode([connection])
+
+    async def activate_group(self, name):
+        """Drive exactly the heads of group name, connecting to any that aren't connected."""
+        uids = self.groups.get(name)
+        if uids is None:
+            return
+        self.active = set()
+        for uid in uids:
+            await self.connect(uid)
+        self._changed()
+        if self.mode:
+            await self._send_mode(self.driven())
+
+    async def set_mode(self, mode):
+        self.mode = mode
+        if mode == "joystick":
+            if not self._send_task or self._send_task.done():
+                self._send_task = asyncio.create_task(send_slider_values(self))
+        else:
+            await self._stop_sending()
+        await self._send_mode(self.driven())
+
+    async def _stop_sending(self):
+        task = self._send_task
+        self._send_task = None
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
 
+    async def on_open(self, connection):
+        uid = connection.peer_uid
+        self.connecting.pop(uid, None)
+        self.connections[uid] = connection
+        if len(self.connections) > STANDBY_MAX and uid not in self.active:
+            # Over the cap, e.g. a late ANSWER to an OFFER we'd given up on
+            del self.connections[uid]
+            await connection.close()
+            return
+        self._changed()
+        if uid in self.active and self.mode:
+            await self._send_mode([connection])
+
+    async def on_close(self, connection):
+        uid = connection.peer_uid
+        if self.connections.get(uid) is connection:
+            del self.connections[uid]
+        if not self.connections:
+            self.mode = None
+            await self._stop_sending()
+        self._changed()
+
+    def publish(self):
+        """Send the per-head connection state to the GUI."""
+        with heads_list_lock:
+            names = {head.get("uid"): head.get("name", "unknown") for head in heads_list if isinstance(head, dict)}
+        heads = []
+        for uid in sorted(set(self.connections) | set(self.connecting) | self.active):
+            if uid in self.connections:
+                state = "connected"
+            elif uid in self.connecting:
+                state = "connecting"
+            else:
+                state = "disconnected"
+            heads.append({"uid": uid, "name": names.get(uid, "unknown"), "state": state,
+                          "active": uid in self.active})
+        gui_bridge.to_gui({"type": "HEAD_POOL_STATE", "heads": heads, "groups": sorted(self.groups)})
+
+head_pool = HeadPool()  # UDP connections to heads, and which of them are being driven
 
 async def init_udp_connection(to_uid):
     try:
@@ -578,8 +1171,10 @@ async def init_udp_connection(to_uid):
         await ws.send(json.dumps(offer_msg))
         print(f"Sent OFFER to {to_uid} with {len(candidates)} candidates")
         
+        return True
     except Exception as e:
         print(f"Error handling init_udp_connection: {e}")
+        return False
 
        
 async def websocket_client(ws_connection, server_url=None):
@@ -631,12 +1226,17 @@ async def websocket_client(ws_connection, server_url=None):
                     if new_network_configs is not None:
                         ota.registry_set('network_configs', new_network_configs)
                 elif my_dict["type"] == "HEADS_LIST":
-                    # Update heads list and send to GUI thread via async_to_gui_queue
+                    # Update heads list and send to GUI thread via gui_bridge
                     new_heads_list = my_dict.get("heads", [])
                     global heads_list
                     with heads_list_lock:
                         heads_list = new_heads_list
-                    async_to_gui_queue.put({"type": "HEADS_LIST", "heads": new_heads_list})
+                    gui_bridge.to_gui({"type": "HEADS_LIST", "heads": new_heads_list})
+                    head_pool.publish()  # pick up the names
+                    head_uids = [head.get("uid") for head in new_heads_list
+                                 if isinstance(head, dict) and head.get("uid")]
+                    await head_pool.prewarm(head_uids)
+                    await tcp_serial.add_heads(head_uids)
                     print(f"Received heads list: {len(new_heads_list)} heads")
                 elif my_dict["type"] == "ANSWER":
                     # from_head receives this - establish connection (server side)
@@ -646,20 +1246,24 @@ async def websocket_client(ws_connection, server_url=None):
                     
                     try:
                         if from_uid not in pending_udp_connections:
-                            print(f"No pending connection found for {from_uid}")
-                            return
+                            # Late ANSWER to an OFFER that timed out or was dropped by disconnect()
+                            print(f"No pending connection found for {from_uid}, ignoring stale ANSWER")
+                            continue
                         
                         conn_info = pending_udp_connections[from_uid]
                         if not conn_info.get("is_server"):
                             print(f"Connection info for {from_uid} is not marked as server, skipping server handler")
-                            return
+                            del pending_udp_connections[from_uid]
+                            conn_info["socket"].close()
+                            continue
                         
                         sock = conn_info["socket"]
                         local_candidates = conn_info.get("local_candidates", [])
                         
                         connection = await UDPConnection.create(
                             sock, local_candidates, candidates, from_uid, uid_hex, ws,
-                            onOpen=onOpen, onClose=onClose
+                            onOpen=onOpen, onClose=onClose,
+                            on_unreliable_message=lambda data, uid=from_uid: on_unreliable_message(data, uid),
                         )
                                                     # Clean up pending connection
                         del pending_udp_connections[from_uid]
@@ -675,6 +1279,7 @@ async def websocket_client(ws_connection, server_url=None):
                     try:
                         data = base64.b64decode(data_b64)
                         print("Andy: ", data)
+                        tcp_serial.deliver(from_uid, target, data)
                         await write_to_com_port(target, data)
                     except Exception as e:
                         print(f"Error forwarding COM_DATA from {from_uid} to COM port: {e}")
@@ -717,37 +1322,43 @@ async def run_gui_task():
         await asyncio.sleep(1)
 
 async def gui_event_pump_task():
-    """Pump GUI events from thread-safe queue into asyncio thread (no asyncio calls in GUI thread)."""
+    """Handle events posted by the GUI thread, in order, on the asyncio thread."""
     while True:
-        event = await asyncio.to_thread(gui_to_async_queue.get)
+        event = await gui_bridge.get()
         try:
-            if isinstance(event, dict) and event.get("type") == "CONNECT":
-                if not current_udp_connection:
-                    to_uid = event.get("to_uid")
-                    if to_uid:
-                        await init_udp_connection(to_uid)
-            elif isinstance(event, dict) and event.get("type") == "DISCONNECT":
-                if current_udp_connection:
-                    await _stop_slider_send_task_if_running(current_udp_connection)
-                    await current_udp_connection.close()
-            elif isinstance(event, dict) and event.get("type") == "SET_MODE":
+            event_type = event.get("type") if isinstance(event, dict) else None
+            if event_type == "CONNECT":
+                to_uid = event.get("to_uid")
+                if to_uid:
+                    await head_pool.connect(to_uid)
+            elif event_type == "DISCONNECT":
+                to_uid = event.get("to_uid")
+                if to_uid:
+                    await head_pool.disconnect(to_uid)
+            elif event_type == "SELECT_HEAD":
+                if event.get("uid"):
+                    await head_pool.select(event.get("uid"))
+            elif event_type == "SET_ACTIVE":
+                await head_pool.set_active(event.get("uid"), bool(event.get("active")))
+            elif event_type == "ACTIVATE_GROUP":
+                await head_pool.activate_group(event.get("name"))
+            elif event_type == "SAVE_GROUP":
+                if event.get("name"):
+                    head_pool.save_group(event.get("name"))
+            elif event_type == "SET_MODE":
                 mode = event.get("mode")
-                if current_udp_connection and mode:
-                    if mode == "joystick":
-                        await _start_slider_send_task_if_needed(current_udp_connection)
-                    else:
-                        await _stop_slider_send_task_if_running(current_udp_connection)
-                    msg = {"type": "SET_MODE", "mode": mode}
-                    channel = getattr(current_udp_connection, "reliable_channel", None)
-                    if channel:
-                        await channel.send(json.dumps(msg).encode("utf-8"))
-        finally:
-            try:
-                gui_to_async_queue.task_done()
-            except Exception:
-                pass
+                if head_pool.connections and mode:
+                    await head_pool.set_mode(mode)
+        except Exception as e:
+            print(f"Error handling GUI event {event}: {e}")
 
 async def as_main(server_url):
+    gui_bridge.attach_loop(asyncio.get_running_loop())
+    head_pool.load_groups()
+    head_pool.publish()
+    tcp_serial.load_ports()
+    await tcp_serial.start()
+    threading.Thread(target=joystick_input_thread, args=(asyncio.get_running_loop(),), daemon=True).start()
     tasks = [
         run_gui_task(),
         gui_event_pump_task(),
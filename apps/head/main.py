@@ -1,11 +1,15 @@
 from udp_con import UDPConnection
 
 import json
+import logging
 import uasyncio as asyncio
 import machine
+import time
 import ubinascii
 import binascii
 from uwebsockets.protocol import ConnectionClosed
+from com_framer import Framer, PROTOCOL_BGC, PROTOCOL_VISCA
+from log_shipper import LogShipper, INFO as LOG_INFO, ERROR as LOG_ERROR
 
 # Get the unique ID as bytes
 uid_bytes = machine.unique_id()
@@ -73,6 +77,11 @@ class MicroPythonWebSocket:
                     raise ConnectionClosed("Heartbeat timeout")
                 raise
 
+    @property
+    def open(self):
+        """True until the underlying connection has been closed."""
+        return self.websocket.open
+
     async def send(self, data):
         self.websocket.send(data)
 
@@ -104,69 +113,508 @@ def ota_trust():
     if ota_present:
         ota.trust()
 
+def registry_get(key, default):
+    if ota_present:
+        return ota.registry_get(key, default)
+    return default
+
 from machine import Pin
-from bgc import BGC
-from camera_sony import CameraSony
+from bgc import BGC, FRAME_BEEP
+from camera_sony import CameraSony, ZOOM_MODE_POSITION
+from spsc_ring import SpscRing
+from mem_stats import MemStats
+import control_packet
+from array import array
 
 # BGC controller instance
 bgc = BGC()
-camera = CameraSony()
+camera = CameraSony(registry_get('camera_baud', None))
 
 led = Pin(25, Pin.OUT)
 
 mode = "joystick"  # "joystick" or "auto_cam"
 
+CONTROL_HZ = 50             # Actuator update rate, independent of packet arrival (registry: control_hz)
+CONTROL_HOLD_MS = 250       # Hold the last command across missing frames for this long, 0 to stop at once (registry: control_hold_ms);
+                            # covers one lost heartbeat when the controller only sends changes
+CONTROL_FRAME_MS = 50       # Nominal controller frame interval; zoom deltas are per frame
+CONTROL_REFRESH_MS = 100    # Re-send an unchanged, non-neutral BGC command at least this often
+CONTROL_STANDBY_MS = 3000   # With no control packet for this long, stop telemetry and polling (three idle heartbeats)
+
+BRIDGE_CHUNK = 256          # Bytes moved per COM_DATA message by the UART bridges
+CAMERA_SERVICE_MS = 50      # Wake the camera task at least this often for lens inquiries and VISCA timeouts
+COM_ACTIVE_MS = 3000        # A UART counts as owned by a COM tool this long after its last COM_DATA
+
+MEM_STATS_MS = 5000         # Interval between MEM_STATS reports over the websocket (registry: mem_stats_ms, 0 disables)
+MEM_PROBE = False           # Also probe the largest free block, at the cost of two collections (registry: mem_probe)
+
+TELEMETRY_HZ = 20           # Rate at which realtime angles are requested from the BGC (registry: telemetry_hz)
+TELEMETRY_STATE_DIVIDER = 10  # Request the full realtime state (errors, motors) every Nth poll
+
 ws = None
 current_server_url = None  # Store server URL for UDP discovery
 pending_udp_connections = {}  # Store pending UDP connection info: peer_uid -> {socket, is_server, local_candidates}
 com_peer_uid = None  # controller uid to send COM_DATA back to (learned from inbound COM_DATA)
+telemetry_channel = None  # unreliable channel of the connection being driven, used for gimbal telemetry
+open_connections = {}  # peer uid -> open UDP connection; the controller keeps standby ones to every head
+driver_uid = None      # peer whose control packets are arriving, None while on standby
+control_rx_ms = 0      # ticks_ms of the last control packet from driver_uid
+
+# While a COM tool is talking to a UART the head stops polling that device and
+# only then forwards its bytes as COM_DATA, so the tool never sees replies to
+# the head's own requests and the VISCA engine never sees the tool's ACKs.
+COM_BGC = 0
+COM_CAMERA = 1
+com_data_ms = array("i", [-1, -1])  # ticks_ms of the last COM_DATA per UART; written on core 0, read on core 1
+
+def _com_active(index, now):
+    seen = com_data_ms[index]
+    return seen >= 0 and 0 <= time.ticks_diff(now, seen) < COM_ACTIVE_MS
+
+class ControlMailbox:
+    """Latest control values posted by the network side and sampled by the control loop."""
+
+    def __init__(self):
+        self.yaw = 0
+        self.pitch = 0
+        self.roll = 0
+        self.zoom = 0  # zoom delta per controller frame
+        self.focus = 0
+        self.iris = 0
+        self.received_ms = 0
+        self.valid = False
+        self.rejected = 0  # packets that weren't control packets
+
+    def post_packet(self, data, offset=0, length=None):
+        """Decode a raw control packet straight into the mailbox, without allocating."""
+        packet_type = control_packet.decode_into(data, self, offset, length)
+        if not packet_type:
+            self.rejected += 1
+            return
+        if packet_type == control_packet.TYPE_CONTROL_DELTA and not self.valid:
+            # A delta only means something on top of a full frame; wait for the next heartbeat
+            return
+        self.received_ms = time.ticks_ms()
+        self.valid = True
+
+control_mailbox = ControlMailbox()
+mem_stats = MemStats()
+
+class ControlLoop:
+    """Per-tick actuator logic, shared by _control_loop_task and the core 1 I/O loop."""
+
+    def __init__(self):
+        self.period_ms = 1000 // registry_get('control_hz', CONTROL_HZ)
+        self.hold_ms = registry_get('control_hold_ms', CONTROL_HOLD_MS)
+        camera.zoom_mode = registry_get('zoom_mode', ZOOM_MODE_POSITION)
+        camera.focus_control = registry_get('focus_control', False)
+        camera.iris_control = registry_get('iris_control', False)
+        # Last yaw/pitch/roll written to the BGC, None until the first send.
+        # Kept separately rather than as a tuple so a tick doesn't allocate.
+        self.sent_yaw = None
+        self.sent_pitch = None
+        self.sent_roll = None
+        self.sent_ms = 0
+        self.zoom_accum = 0
+
+    def tick(self, box, now):
+        if box.valid and time.ticks_diff(now, box.received_ms) <= self.hold_ms:
+            # Fresh sample, or extrapolated by holding the last one across missing frames
+            yaw = box.yaw
+            pitch = box.pitch
+            roll = box.roll
+            zoom_rate = box.zoom
+        else:
+            yaw = pitch = roll = 0
+            zoom_rate = 0
+
+        # Pace UART writes: at most one BGC frame per tick, and never queue behind a frame still going out
+        changed = yaw != self.sent_yaw or pitch != self.sent_pitch or roll != self.sent_roll
+        if changed or ((yaw or pitch or roll) and time.ticks_diff(now, self.sent_ms) >= CONTROL_REFRESH_MS):
+            if not bgc.tx_busy():
+                bgc.send_joystick_control(yaw, pitch, roll)
+                self.sent_yaw = yaw
+                self.sent_pitch = pitch
+                self.sent_roll = roll
+                self.sent_ms = now
+
+        # Zoom deltas are per controller frame, so scale them to the tick length.
+        # Integer arithmetic (truncating toward zero) because floats are heap objects here.
+        self.zoom_accum += zoom_rate * self.period_ms
+        if self.zoom_accum >= 0:
+            zoom_step = self.zoom_accum // CONTROL_FRAME_MS
+        else:
+            zoom_step = -(-self.zoom_accum // CONTROL_FRAME_MS)
+        if zoom_step:
+            self.zoom_accum -= zoom_step * CONTROL_FRAME_MS
+        if not zoom_rate:
+            self.zoom_accum = 0
+        if box.valid:
+            camera.update_lens(zoom_rate, zoom_step, box.focus, box.iris)
+
+async def _control_loop_task():
+    """Drive the BGC and camera at a fixed rate from the latest mailbox values."""
+    control = ControlLoop()
+    period_ms = control.period_ms
+    next_ms = time.ticks_ms()
+    while True:
+        try:
+            control.tick(control_mailbox, time.ticks_ms())
+            # Any collection due happens here, between ticks, rather than mid-update
+            mem_stats.after_tick()
+
+            next_ms = time.ticks_add(next_ms, period_ms)
+            delay = time.ticks_diff(next_ms, time.ticks_ms())
+            if delay < 0:
+                # Overran a tick; re-anchor rather than bursting to catch up
+                next_ms = time.ticks_ms()
+                delay = 0
+            await asyncio.sleep_ms(delay)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            print("Error in _control_loop_task:", e)
+            await asyncio.sleep(0.1)
+            next_ms = time.ticks_ms()
+
+async def _mem_stats_task():
+    """Periodically report heap and GC statistics to the server."""
+    interval_ms = registry_get('mem_stats_ms', MEM_STATS_MS)
+    if not interval_ms:
+        return
+    probe = registry_get('mem_probe', MEM_PROBE)
+    while True:
+        try:
+            await asyncio.sleep_ms(interval_ms)
+            stats = mem_stats.sample(probe)
+            stats["type"] = "MEM_STATS"
+            stats["uid"] = uid_hex
+            stats["rejected_packets"] = control_mailbox.rejected
+            if ws:
+                await ws.send(json.dumps(stats))
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            print("Error in _mem_stats_task:", e)
+            await asyncio.sleep(1)
+
+async def _send_com_bytes(target, data):
+    """Send UART bytes to the controller as one COM_DATA message."""
+    peer = com_peer_uid
+    if peer and ws:
+        msg = {
+            "type": "COM_DATA",
+            "target": target,
+            "to_uid": peer,
+            "from_uid": uid_hex,
+            "data": binascii.b2a_base64(data).decode().strip(),
+        }
+        await ws.send(json.dumps(msg))
+
+async def _send_com_data(target, framer):
+    """Send the framer's complete frames to the controller as one COM_DATA message."""
+    count = framer.ready
+    if not count:
+        return
+    await _send_com_bytes(target, framer.view[:count])
+    framer.consume(count)
+
+async def _forward_com_data(target, framer, view, count):
+    """Feed count bytes from view through the framer, sending whole frames as they complete."""
+    offset = 0
+    while offset < count:
+        offset += framer.feed(view, count - offset, offset)
+        await _send_com_data(target, framer)
 
 async def _bgc_com_tx_task():
     """Read raw bytes from BGC UART and send to controller via COM_DATA websocket messages."""
     global ws, com_peer_uid
+    buf = bytearray(BRIDGE_CHUNK)
+    view = memoryview(buf)
+    framer = Framer(PROTOCOL_BGC)
     while True:
         try:
-            data = bgc.read_raw()
-            if data:
-                peer = com_peer_uid
-                if peer and ws:
-                    msg = {
-                        "type": "COM_DATA",
-                        "target": "bgc",
-                        "to_uid": peer,
-                        "from_uid": uid_hex,
-                        "data": binascii.b2a_base64(data).decode().strip(),
-                    }
-                    await ws.send(json.dumps(msg))
-            await asyncio.sleep(0.01)
+            # Sleep until the UART interrupt has buffered something; a partial
+            # frame is sent anyway once the line has been idle for a few ms
+            if framer.pending():
+                try:
+                    await asyncio.wait_for_ms(bgc.uart.wait(), framer.idle_ms)
+                except asyncio.TimeoutError:
+                    framer.flush()
+                    await _send_com_data("bgc", framer)
+                    continue
+            else:
+                await bgc.uart.wait()
+            count = bgc.readinto(buf)
+            if count:
+                bgc.parse(buf, count)
+                if _com_active(COM_BGC, time.ticks_ms()):
+                    await _forward_com_data("bgc", framer, view, count)
+                else:
+                    framer.reset()
         except asyncio.CancelledError:
             break
         except Exception as e:
             print("Error in _bgc_com_tx_task:", e)
+            framer.reset()
+            await asyncio.sleep(0.1)
+
+async def _bgc_telemetry_task():
+    """Poll the BGC for realtime data and stream decoded gimbal state over the unreliable channel."""
+    period = 1.0 / registry_get('telemetry_hz', TELEMETRY_HZ)
+    poll_count = 0
+    while True:
+        try:
+            channel = telemetry_channel
+            if channel and not _com_active(COM_BGC, time.ticks_ms()):
+                if poll_count % TELEMETRY_STATE_DIVIDER == 0:
+                    bgc.request_realtime_state()
+                else:
+                    bgc.request_realtime_angles()
+                poll_count += 1
+            await asyncio.sleep(period)
+            # Replies are parsed by _bgc_com_tx_task while we sleep
+            if channel and bgc.state.updated:
+                await channel.send(bgc.encode_telemetry())
+            if channel and camera.lens.updated:
+                await channel.send(camera.encode_telemetry())
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            print("Error in _bgc_telemetry_task:", e)
             await asyncio.sleep(0.1)
 
 async def _camera_com_tx_task():
     """Read raw bytes from camera UART and send to controller via COM_DATA websocket messages."""
     global ws, com_peer_uid
+    buf = bytearray(BRIDGE_CHUNK)
+    view = memoryview(buf)
+    framer = Framer(PROTOCOL_VISCA)
     while True:
         try:
-            data = camera.read_raw()
-            if data != None:
-                peer = com_peer_uid
-                if peer and ws:
-                    msg = {
-                        "type": "COM_DATA",
-                        "target": "camera",
-                        "to_uid": peer,
-                        "from_uid": uid_hex,
-                        "data": binascii.b2a_base64(data).decode().strip(),
-                    }
-                    await ws.send(json.dumps(msg))
-            await asyncio.sleep(0.0)
+            camera.hold(_com_active(COM_CAMERA, time.ticks_ms()))
+            if telemetry_channel:
+                camera.poll_lens()
+            pending = framer.pending()
+            try:
+                await asyncio.wait_for_ms(camera.uart.wait(), framer.idle_ms if pending else CAMERA_SERVICE_MS)
+            except asyncio.TimeoutError:
+                if pending:
+                    framer.flush()
+                    await _send_com_data("camera", framer)
+            count = camera.readinto(buf)
+            if count:
+                camera.parse(buf, count)
+                if camera.held:
+                    await _forward_com_data("camera", framer, view, count)
+                else:
+                    framer.reset()
+            else:
+                camera.visca.pump()
         except asyncio.CancelledError:
             break
         except Exception as e:
             print("Error in _camera_com_tx_task:", e)
+            framer.reset()
+            await asyncio.sleep(0.1)
+
+# Dual-core mode (registry: dual_core). Core 1 owns the UARTs and runs the
+# actuator path in a plain loop: control-packet decode, the control tick, BGC
+# and VISCA framing, and telemetry polling. Core 0 keeps the network side and
+# talks to it only through two SPSC rings, so a websocket or GC stall on core 0
+# can't delay a gimbal command.
+IO_CORE_POLL_MS = 1         # Core 1 loop sleep
+IO_BRIDGE_POLL_MS = 5       # Core 0 polling interval for records from core 1
+IO_SLOTS = 16
+IO_SLOT_SIZE = 128
+
+REC_CONTROL = 1             # core 0 -> 1: raw control packet
+REC_BGC = 2                 # both ways: BGC UART bytes
+REC_CAMERA = 3              # both ways: camera UART bytes
+REC_TELEMETRY = 4           # core 1 -> 0: packet for the unreliable channel
+
+dual_core = False
+net_to_io = None
+io_to_net = None
+io_core_error = None        # last exception raised on core 1, reported by core 0
+
+def _io_forward(kind, framer):
+    """Queue the framer's complete frames for core 0 in slot-sized records."""
+    count = framer.ready
+    offset = 0
+    while offset < count:
+        chunk = min(count - offset, IO_SLOT_SIZE)
+        io_to_net.put(kind, framer.buf, chunk, offset)
+        offset += chunk
+    framer.consume(count)
+
+def _io_feed(kind, framer, buf, count):
+    offset = 0
+    while offset < count:
+        offset += framer.feed(buf, count - offset, offset)
+        _io_forward(kind, framer)
+
+def _io_dispatch(box, rec, views, n):
+    """Act on one n-byte record from core 0: a control packet, or bytes for a UART."""
+    kind = rec[0]
+    if kind == REC_CONTROL:
+        box.post_packet(rec, 1, n - 1)
+        return
+    # views[n] is rec[1:n], made on first use so a UART write doesn't allocate
+    view = views[n]
+    if view is None:
+        view = views[n] = memoryview(rec)[1:n]
+    if kind == REC_BGC:
+        bgc.write_raw(view)
+    elif kind == REC_CAMERA:
+        camera.write_raw(view)
+
+def _io_core_main(control, telemetry_ms):
+    """Core 1 loop: service the UARTs, run the control tick and poll telemetry."""
+    global io_core_error
+    box = ControlMailbox()
+    rec = bytearray(IO_SLOT_SIZE + 1)
+    rec_views = [None] * (IO_SLOT_SIZE + 2)
+    buf = bytearray(BRIDGE_CHUNK)
+    bgc_framer = Framer(PROTOCOL_BGC)
+    camera_framer = Framer(PROTOCOL_VISCA)
+    now = time.ticks_ms()
+    bgc_rx_ms = camera_rx_ms = now
+    next_control_ms = next_telemetry_ms = now
+    poll_count = 0
+    while True:
+        try:
+            # Commands from the network core
+            while True:
+                n = net_to_io.get_into(rec)
+                if not n:
+                    break
+                _io_dispatch(box, rec, rec_views, n)
+            # Camera frames queued above or by the lens logic below go out from here
+            camera.link.poll()
+
+            now = time.ticks_ms()
+            linked = telemetry_channel is not None
+            bgc_com = _com_active(COM_BGC, now)
+            camera.hold(_com_active(COM_CAMERA, now))
+
+            count = bgc.readinto(buf)
+            if count:
+                bgc.parse(buf, count)
+                if bgc_com:
+                    _io_feed(REC_BGC, bgc_framer, buf, count)
+                else:
+                    bgc_framer.reset()
+                bgc_rx_ms = now
+            elif bgc_framer.pending() and time.ticks_diff(now, bgc_rx_ms) >= bgc_framer.idle_ms:
+                bgc_framer.flush()
+                _io_forward(REC_BGC, bgc_framer)
+
+            if linked:
+                camera.poll_lens()
+            count = camera.readinto(buf)
+            if count:
+                camera.parse(buf, count)
+                if camera.held:
+                    _io_feed(REC_CAMERA, camera_framer, buf, count)
+                else:
+                    camera_framer.reset()
+                camera_rx_ms = now
+            else:
+                if camera_framer.pending() and time.ticks_diff(now, camera_rx_ms) >= camera_framer.idle_ms:
+                    camera_framer.flush()
+                    _io_forward(REC_CAMERA, camera_framer)
+                camera.visca.pump()
+
+            if time.ticks_diff(now, next_control_ms) >= 0:
+                control.tick(box, now)
+                next_control_ms = time.ticks_add(next_control_ms, control.period_ms)
+                if time.ticks_diff(next_control_ms, now) < 0:
+                    # Overran a tick; re-anchor rather than bursting to catch up
+                    next_control_ms = now
+
+            if linked and time.ticks_diff(now, next_telemetry_ms) >= 0:
+                # Replies to the previous request have been parsed by now
+                if bgc.state.updated:
+                    packet = bgc.encode_telemetry()
+                    io_to_net.put(REC_TELEMETRY, packet, len(packet))
+                if camera.lens.updated:
+                    packet = camera.encode_telemetry()
+                    io_to_net.put(REC_TELEMETRY, packet, len(packet))
+                if not bgc_com:
+                    if poll_count % TELEMETRY_STATE_DIVIDER == 0:
+                        bgc.request_realtime_state()
+                    else:
+                        bgc.request_realtime_angles()
+                    poll_count += 1
+                next_telemetry_ms = time.ticks_add(now, telemetry_ms)
+
+            time.sleep_ms(IO_CORE_POLL_MS)
+        except Exception as e:
+            # print() would touch the log shipper from this core; core 0 reports it
+            io_core_error = e
+            time.sleep_ms(100)
+
+def _start_io_core():
+    """Hand the UARTs and the actuator path to core 1."""
+    global dual_core, net_to_io, io_to_net
+    import _thread
+    net_to_io = SpscRing(IO_SLOTS, IO_SLOT_SIZE)
+    io_to_net = SpscRing(IO_SLOTS, IO_SLOT_SIZE)
+    # UART interrupts would be serviced on core 0; core 1 polls instead
+    bgc.uart.disable_irq()
+    camera.uart.disable_irq()
+    # Registry reads touch the filesystem, so do them here rather than on core 1
+    control = ControlLoop()
+    telemetry_ms = 1000 // registry_get('telemetry_hz', TELEMETRY_HZ)
+    dual_core = True
+    _thread.start_new_thread(_io_core_main, (control, telemetry_ms))
+    print("Actuator path running on core 1")
+
+def _uart_write(target, data):
+    """Write bytes to the camera or BGC UART, via core 1 when it owns them."""
+    if dual_core:
+        kind = REC_CAMERA if target == "camera" else REC_BGC
+        offset = 0
+        while offset < len(data):
+            chunk = min(len(data) - offset, IO_SLOT_SIZE)
+            net_to_io.put(kind, data, chunk, offset)
+            offset += chunk
+    elif target == "camera":
+        camera.write_raw(data)
+    else:
+        bgc.write_raw(data)
+
+async def _io_core_bridge_task():
+    """Core 0 side of dual-core mode: forward core 1's UART bytes and telemetry to the network."""
+    global io_core_error
+    rec = bytearray(IO_SLOT_SIZE + 1)
+    view = memoryview(rec)
+    reported_drops = 0
+    while True:
+        try:
+            n = io_to_net.get_into(rec)
+            if not n:
+                if io_core_error is not None:
+                    print("Error in core 1 I/O loop:", io_core_error)
+                    io_core_error = None
+                drops = io_to_net.dropped + net_to_io.dropped
+                if drops != reported_drops:
+                    print("Core 1 rings dropped", drops - reported_drops, "records")
+                    reported_drops = drops
+                await asyncio.sleep_ms(IO_BRIDGE_POLL_MS)
+                continue
+            kind = rec[0]
+            if kind == REC_TELEMETRY:
+                channel = telemetry_channel
+                if channel:
+                    await channel.send(bytes(view[1:n]))
+            else:
+                await _send_com_bytes("camera" if kind == REC_CAMERA else "bgc", view[1:n])
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            print("Error in _io_core_bridge_task:", e)
             await asyncio.sleep(0.1)
 
 def http_to_ws_url(http_url):
@@ -181,23 +629,41 @@ def http_to_ws_url(http_url):
 
 import builtins
 
-# print function that also sends to websocket if available
+log_shipper = LogShipper()
+
+# Logger output (udp_con, uwebsockets) is shipped alongside print output
+logging.add_sink(logging.TextSink(log_shipper.push))
+
+# print function that also queues the text for shipping over the websocket.
+# Sending happens in _log_ship_task so a burst of prints can't stall the caller.
 def ws_print(*args, **kwargs):
     original_print(*args, **kwargs)
 
     # Our overridden print cannot raise an exception, so we need to catch it here
     try:
-        if ws and getattr(ws, 'open', True):
-            sep = kwargs.get("sep", " ")
-            end = kwargs.get("end", "\n")
-            message = sep.join(str(arg) for arg in args) + end
-
-            data = {"type": "PRINTF",
-                    "uid": uid_hex,
-                    "message": message.strip()}
-            ws.send_sync(json.dumps(data))
+        sep = kwargs.get("sep", " ")
+        message = sep.join(str(arg) for arg in args)
+        level = LOG_ERROR if message.startswith("Error") else LOG_INFO
+        log_shipper.push(level, message)
     except Exception as e:
-        original_print(f"Error sending PRINTF via websocket: {e}")
+        original_print(f"Error queueing PRINTF: {e}")
+
+async def _send_printf(message):
+    data = {"type": "PRINTF",
+            "uid": uid_hex,
+            "message": message}
+    await ws.send(json.dumps(data))
+
+async def _log_ship_task():
+    """Send queued print output to the server in batched PRINTF messages."""
+    while True:
+        try:
+            await log_shipper.run(_send_printf, lambda: ws is not None and ws.open)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            original_print(f"Error sending PRINTF via websocket: {e}")
+            await asyncio.sleep(1)
 
 # Override the built-in print function
 original_print = builtins.print
@@ -214,20 +680,56 @@ async def occasional_send(channel, my_string):
         await channel.send(my_string.encode('utf-8'))
         await asyncio.sleep(1)
 
+def _set_driver(peer_uid):
+    """Stream telemetry and run the keepalive only on the connection being driven (None: standby)."""
+    global driver_uid, telemetry_channel
+    previous = open_connections.get(driver_uid)
+    if previous and getattr(previous, '_occasional_send_task', None):
+        previous._occasional_send_task.cancel()
+        previous._occasional_send_task = None
+    connection = open_connections.get(peer_uid)
+    if connection is None:
+        if driver_uid is not None:
+            print("No control from", driver_uid, "- standing by")
+        driver_uid = None
+        telemetry_channel = None
+        return
+    driver_uid = peer_uid
+    telemetry_channel = connection.unreliable_channel
+    connection._occasional_send_task = asyncio.create_task(occasional_send(connection.reliable_channel, uid_hex + 'rel'))
+    print("Driven by", peer_uid)
+
+async def _standby_task():
+    """Drop back to standby once the driving connection stops sending control."""
+    while True:
+        try:
+            await asyncio.sleep_ms(CONTROL_STANDBY_MS // 4)
+            if driver_uid is not None and time.ticks_diff(time.ticks_ms(), control_rx_ms) >= CONTROL_STANDBY_MS:
+                _set_driver(None)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            print("Error in _standby_task:", e)
+
 async def onOpen(connection):
     print("Connection opened (onOpen callback)")
-    
-    # Access channels from connection
-    reliable_channel = connection.reliable_channel
-    
-    # Start occasional_send task
-    occasional_send_task = asyncio.create_task(occasional_send(reliable_channel, uid_hex + 'rel'))
-    connection._occasional_send_task = occasional_send_task
+    # A hot-standby connection; telemetry starts when control arrives on it
+    if connection.peer_uid == driver_uid:
+        # Reconnected: leave the old connection's channel until control arrives here
+        _set_driver(None)
+    open_connections[connection.peer_uid] = connection
 
 async def onClose(connection):
     print("Connection closed (onClose callback)")
+    if not connection:
+        return
+    peer_uid = connection.peer_uid
+    if open_connections.get(peer_uid) is connection:
+        if peer_uid == driver_uid:
+            _set_driver(None)
+        del open_connections[peer_uid]
     # Kill occasional_send task
-    if connection and hasattr(connection, '_occasional_send_task') and connection._occasional_send_task:
+    if getattr(connection, '_occasional_send_task', None):
         connection._occasional_send_task.cancel()
         try:
             await connection._occasional_send_task
@@ -275,11 +777,22 @@ async def on_reliable_message(data):
     except Exception as e:
         print(f"Error handling SET_MODE over reliable channel: {e}")
 
+def _control_receiver(peer_uid):
+    """on_unreliable_message for one connection; control arriving on it makes it the driver."""
+    async def on_control(data):
+        global control_rx_ms
+        control_rx_ms = time.ticks_ms()
+        if peer_uid != driver_uid:
+            _set_driver(peer_uid)
+        await on_unreliable_message(data)
+    return on_control
+
 async def on_unreliable_message(data):
-    fields = BGC.decode_udp_packet(data)
-    if fields:
-        bgc.send_joystick_control(fields["yaw"], fields["pitch"], fields["roll"])
-        camera.move_zoom(fields["zoom"])
+    # Only record the latest values; the control loop does the UART writes at its own rate
+    if dual_core:
+        net_to_io.put(REC_CONTROL, data, len(data))
+        return
+    control_mailbox.post_packet(data)
                         
 async def websocket_client(ws_connection, server_url=None):
     """Handle WebSocket client logic with an upgraded connection"""
@@ -287,6 +800,7 @@ async def websocket_client(ws_connection, server_url=None):
     ws = ws_connection
     if server_url:
         current_server_url = server_url
+    io_tasks = []
     try:
         device_name = ota.registry_get('name', 'unknown')
         app_path = ota.registry_get('app_path', 'apps/base')
@@ -310,9 +824,19 @@ async def websocket_client(ws_connection, server_url=None):
         await ws.send(json.dumps(data))
         ota_trust()
 
-        # Start BGC -> WS COM_DATA bridge (TX direction)
-        bgc_tx_task = asyncio.create_task(_bgc_com_tx_task())
-        camera_tx_task = asyncio.create_task(_camera_com_tx_task())
+        if dual_core:
+            # Core 1 drives the UARTs; just relay its records
+            io_tasks.append(asyncio.create_task(_io_core_bridge_task()))
+        else:
+            # Start BGC -> WS COM_DATA bridge (TX direction)
+            io_tasks.append(asyncio.create_task(_bgc_com_tx_task()))
+            io_tasks.append(asyncio.create_task(camera.link.run()))
+            io_tasks.append(asyncio.create_task(_camera_com_tx_task()))
+            io_tasks.append(asyncio.create_task(_bgc_telemetry_task()))
+            io_tasks.append(asyncio.create_task(_control_loop_task()))
+        log_task = asyncio.create_task(_log_ship_task())
+        io_tasks.append(asyncio.create_task(_mem_stats_task()))
+        io_tasks.append(asyncio.create_task(_standby_task()))
 
         while True:
             msg = await ws.recv()
@@ -335,7 +859,7 @@ async def websocket_client(ws_connection, server_url=None):
                     ota.registry_set('network_configs', new_network_configs)
             elif my_dict["type"] == "IDENTIFY":
                 led.toggle()
-                bgc.beep()
+                _uart_write("bgc", FRAME_BEEP)
             elif my_dict["type"] == "COM_DATA":
                 # Raw bytes destined for BGC UART (from controller COM tunnel)
                 try:
@@ -344,12 +868,11 @@ async def websocket_client(ws_connection, server_url=None):
                     data_b64 = my_dict.get("data", "")
                     if from_uid:
                         com_peer_uid = from_uid
+                    # Mark the UART as the tool's before its bytes reach it
+                    com_data_ms[COM_CAMERA if target == "camera" else COM_BGC] = time.ticks_ms()
                     if data_b64:
                         raw = binascii.a2b_base64(data_b64)
-                        if target == "camera":
-                            camera.write_raw(raw)
-                        else:
-                            bgc.write_raw(raw)
+                        _uart_write(target, raw)
                 except Exception as e:
                     print("Error handling COM_DATA:", e)
             elif my_dict["type"] == "OFFER":
@@ -386,7 +909,7 @@ async def websocket_client(ws_connection, server_url=None):
                         onOpen=onOpen,
                         onClose=onClose,
                         on_reliable_message=on_reliable_message,
-                        on_unreliable_message=on_unreliable_message,
+                        on_unreliable_message=_control_receiver(from_uid),
                     )
                     
                     # Clean up pending connection
@@ -396,14 +919,15 @@ async def websocket_client(ws_connection, server_url=None):
                     print(f"Error handling OFFER: {e}")
                                         
     finally:
+        for task in io_tasks:
+            try:
+                task.cancel()
+                await task
+            except Exception:
+                pass
         try:
-            bgc_tx_task.cancel()
-            await bgc_tx_task
-        except Exception:
-            pass
-        try:
-            camera_tx_task.cancel()
-            await camera_tx_task
+            log_task.cancel()
+            await log_task
         except Exception:
             pass
         ws = None
@@ -422,6 +946,8 @@ async def as_main(server_url):
 
 def main(server_url):
     """Main entry point - receives server_url from ota_update.py"""
+    if registry_get('dual_core', False) and not dual_core:
+        _start_io_core()
     try:
         asyncio.run(as_main(server_url))
     finally:
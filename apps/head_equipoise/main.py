@@ -1,6 +1,7 @@
 from udp_con import UDPConnection
 
 import json
+import logging
 import threading
 import time
 import queue
@@ -12,10 +13,12 @@ import os
 import base64
 import websockets
 
+import rail
 from rail import Sled
+import control_packet
 
+# Calibrated by calibrate_sled() once the event loop is running
 sled = Sled()
-sled.calibrate()
 
 try:
     import serial
@@ -25,6 +28,9 @@ except ImportError:
     serial_available = False
     print("pyserial not available - COM port forwarding disabled")
 
+# udp_con reports connection progress at INFO
+logging.basicConfig(level=logging.INFO)
+
 # Generate a unique ID based on MAC address + random string (unique per instance)
 uid_hex = format(uuid.getnode(), 'x') + secrets.token_hex(8)
 
@@ -67,21 +73,21 @@ map_iris = lambda value: (value + 512) >> 4
 map_focus = lambda value: (value + 512) >> 4
 map_pitch = lambda value: int(value * 0.2)
 
-async def send_udp_message(values, channel):
-    # Pack values into a UDP message
+async def send_udp_message(values, channel, encoder=None):
+    """Send the control values; with a DeltaEncoder, only what changed or a due heartbeat."""
     values = values.copy()  # Don't modify the original
     values[1] = map_pitch(values[1])
     values[3] = map_zoom(values[3])
     values[4] = map_focus(values[4])
     values[5] = map_iris(values[5])
-    # Pack values into bytes
-    message_bytes = bytes([0xDE, 0xFD, values[3] & 0xFF, (values[3] >> 8) & 0xFF,
-                           (values[4] >> 8) & 0xFF, values[4] & 0xFF,
-                           (values[5] >> 8) & 0xFF, values[5] & 0xFF,
-                           (values[0] >> 8) & 0xFF, values[0] & 0xFF,
-                           (values[1] >> 8) & 0xFF, values[1] & 0xFF,
-                           (values[2] >> 8) & 0xFF, values[2] & 0xFF,
-                           0x00, 0x00])
+    if encoder:
+        message_bytes = encoder.update(int(time.monotonic() * 1000), zoom=values[3], focus=values[4],
+                                       iris=values[5], yaw=values[0], pitch=values[1], roll=values[2])
+        if message_bytes is None:
+            return
+    else:
+        message_bytes = control_packet.encode(zoom=values[3], focus=values[4], iris=values[5],
+                                              yaw=values[0], pitch=values[1], roll=values[2])
     if channel:
         await channel.send(message_bytes)
 
@@ -372,8 +378,12 @@ ws = None
 current_server_url = None  # Store server URL for UDP discovery
 pending_udp_connections = {}  # Store pending UDP connection info: peer_uid -> {socket, is_server, local_candidates}
 reliable_channel = None  # Store the reliable channel for sending UDP messages
+unreliable_channel = None  # Unreliable channel of the open UDP connection, used for sled telemetry
 current_slider_values = [0] * 6  # Store current slider values (thread-safe access needed)
 slider_values_lock = threading.Lock()  # Lock for thread-safe access to slider values
+CONTROL_DELTA = True   # Send only changed axes plus a full-frame heartbeat; False sends every frame in full
+CONTROL_POLL_S = 0.01  # How often the slider values are checked for changes in delta mode
+CONTROL_SEND_S = 0.05  # Full-frame interval otherwise
 heads_list = []  # Store current heads list
 heads_list_lock = threading.Lock()  # Lock for thread-safe access to heads list
 heads_dropdown = None  # Reference to the dropdown widget
@@ -402,13 +412,15 @@ def get_manifest():
     return manifest
 
 async def send_slider_values(channel):
+    encoder = control_packet.DeltaEncoder() if CONTROL_DELTA else None
+    interval = CONTROL_POLL_S if CONTROL_DELTA else CONTROL_SEND_S
     while True:
         global current_slider_values
         if channel:
             with slider_values_lock:
                 values = current_slider_values.copy()
-            await send_udp_message(values, channel)
-        await asyncio.sleep(0.05)  # 50ms interval, same as original update_values
+            await send_udp_message(values, channel, encoder)
+        await asyncio.sleep(interval)
 
 async def _com_port_forwarding_task(port_name: str, target: str):
     """Read from a local COM port and forward to selected head via websocket as COM_DATA."""
@@ -614,13 +626,18 @@ async def on_reliable_message(data):
     except Exception as e:
         print(f"Error handling SET_MODE over reliable channel: {e}")
 
+control_fields = control_packet.ControlFields()
+control_valid = False  # a delta only updates some fields, so wait for a full frame first
+
 async def on_unreliable_message(data):
+    global control_valid
     # print(data)
-    fields = Sled.decode_udp_packet(data)
-    if fields:
-        print(fields["yaw"])
+    packet_type = control_packet.decode_into(data, control_fields)
+    if packet_type and packet_type != control_packet.TYPE_CONTROL_DELTA:
+        control_valid = True
+    if packet_type and control_valid:
         # This is crap, but it'll do for now.
-        vel = (fields["yaw"] / 512) * 20 
+        vel = (control_fields.yaw / 512) * 20 
         sled.set_velocity(vel)
 
 async def websocket_client(ws_connection, server_url=None):
@@ -832,8 +849,89 @@ async def gui_event_pump_task():
             except Exception:
                 pass
 
+SLED_TELEMETRY_BATCH_S = 0.1  # How often sampled sled telemetry is streamed to the controller
+SLED_STATS_S = 1.0            # How often a summary goes to the server as SLED_STATS
+SLED_RETRY_S = 2.0            # First wait before retrying a failed sled calibration
+SLED_RETRY_MAX_S = 30.0       # Longest wait between retries
+
+def summarise_sled_samples(samples):
+    """Reduce a window of sled samples to the SLED_STATS fields."""
+    last = samples[-1]
+    errors = 0
+    for sample in samples:
+        errors |= sample.errors
+    return {
+        "pos": last.pos,
+        "vel": last.vel,
+        "iq": last.iq,
+        "iq_mean": sum(sample.iq for sample in samples) / len(samples),
+        "iq_peak": max(abs(sample.iq) for sample in samples),
+        "vel_peak": max(abs(sample.vel) for sample in samples),
+        "errors": errors,
+        "samples": len(samples),
+    }
+
+async def sled_telemetry_task():
+    """Stream sled samples to the controller and summarise them to the server."""
+    if ota_present:
+        sled.telemetry_hz = ota.registry_get('sled_telemetry_hz', sled.telemetry_hz)
+    window = []
+    next_stats = time.monotonic() + SLED_STATS_S
+    while True:
+        try:
+            await asyncio.sleep(SLED_TELEMETRY_BATCH_S)
+            samples = sled.take_samples()
+            channel = unreliable_channel
+            if samples and channel:
+                for start in range(0, len(samples), rail.TELEMETRY_BATCH_MAX):
+                    await channel.send(rail.pack_samples(samples[start:start + rail.TELEMETRY_BATCH_MAX]))
+            window.extend(samples)
+            if time.monotonic() >= next_stats:
+                next_stats = time.monotonic() + SLED_STATS_S
+                if window and ws:
+                    stats = summarise_sled_samples(window)
+                    stats["type"] = "SLED_STATS"
+                    stats["uid"] = uid_hex
+                    await ws.send(json.dumps(stats))
+                window = []
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            print("Error in sled_telemetry_task:", e)
+            await asyncio.sleep(1)
+
+async def calibrate_sled():
+    """Calibrate the sled alongside the websocket, reporting progress to the server."""
+    async def report(stage):
+        print("Sled:", stage)
+        if ws:
+            try:
+                await ws.send(json.dumps({"type": "SLED_CALIBRATION", "uid": uid_hex, "stage": stage}))
+            except Exception:
+                pass
+
+    def progress(stage):
+        asyncio.create_task(report(stage))
+
+    saved = ota.registry_get('sled_calibration', None) if ota_present else None
+    # Keep trying (the ODrive may not be plugged in yet); until this succeeds
+    # the sled worker isn't running and sled control is ignored
+    delay = SLED_RETRY_S
+    while True:
+        try:
+            calibration = await sled.calibrate(saved, progress)
+            break
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            progress(f"calibration failed: {e}; retrying in {delay:.0f} s")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, SLED_RETRY_MAX_S)
+    if ota_present and calibration != saved:
+        ota.registry_set('sled_calibration', calibration)
+
 async def as_main(server_url):
-    tasks = [websocket(server_url)]
+    tasks = [websocket(server_url), calibrate_sled(), sled_telemetry_task()]
 
     # Run all tasks concurrently
     await asyncio.gather(*tasks)
@@ -1,123 +1,282 @@
 import odrive
 from odrive.utils import dump_errors, request_state
 from odrive.enums import AxisState, ControlMode
-import time
+import asyncio
+import collections
 import struct
+import threading
+import time
 
 POS_TO_METRES = 29.26789093017578 / 2.726
+VEL_LIMIT = 20
+STATE_CHECK_S = 0.5  # How often the worker checks the axis is still in closed loop
+HOLD_S = 0.25        # A non-zero velocity not refreshed for this long is dropped to zero (heads: CONTROL_HOLD_MS)
+POLL_S = 0.05        # Position/state polling interval while calibrating
+TELEMETRY_HZ = 50    # Default sampling rate of position, velocity, Iq and errors; 0 disables
+TELEMETRY_BACKLOG = 256  # Samples kept until taken; the oldest are dropped beyond this
 
-class Sled:
-  def __init__(self):
-    self.odrv0 = odrive.find_sync()
-    self.ax = self.odrv0.axis0
+# Sled telemetry streamed to the controller over the unreliable channel (see
+# apps/controller/main.py): header, type, sample count, then per sample the
+# time (ms, wrapping), position (m), velocity (m/s), Iq (A) and axis error flags
+TELEMETRY_HEADER = 0xDE
+TELEMETRY_SLED = 0xB3
+TELEMETRY_BATCH_FORMAT = "<3B"
+TELEMETRY_SAMPLE_FORMAT = "<IfffI"
+TELEMETRY_SAMPLE_SIZE = struct.calcsize(TELEMETRY_SAMPLE_FORMAT)
+TELEMETRY_BATCH_MAX = 32  # samples per packet
 
-  @staticmethod
-  def decode_udp_packet(data: bytes):
-    """Decode a 16-byte control packet into fields."""
-    if len(data) != 16:
-      print("Unexpected length:", len(data))
-      return None
+SledSample = collections.namedtuple("SledSample", "time_ms pos vel iq errors")
 
-    if data[0] != 0xDE:
-      print("Invalid header:", data[0])
-      return None
+def pack_samples(samples):
+    """Pack up to TELEMETRY_BATCH_MAX samples into one telemetry packet."""
+    packet = bytearray(struct.pack(TELEMETRY_BATCH_FORMAT, TELEMETRY_HEADER, TELEMETRY_SLED, len(samples)))
+    for sample in samples:
+        packet += struct.pack(TELEMETRY_SAMPLE_FORMAT, *sample)
+    return bytes(packet)
 
-    data_type = data[1]
+class Sled:
+  """
+  ODrive sled. calibrate() finds the ODrive and homes the sled without
+  blocking the event loop, then starts the worker: from then on
+  set_velocity() only posts the latest value and the worker thread does all
+  the USB I/O, writing just the settings that changed and checking for
+  errors on its own slow schedule. Velocities posted before then are dropped,
+  and a non-zero one that isn't refreshed within HOLD_S is replaced by zero.
+  The worker also samples telemetry at telemetry_hz; see take_samples().
+  """
 
-    if data_type == 0xFD:
-      zoom, focus, iris, yaw, pitch, roll, _ = struct.unpack(">6h2s", data[2:16])
-      return {
-        "zoom": zoom,
-        "focus": focus,
-        "iris": iris,
-        "yaw": yaw,
-        "pitch": pitch,
-        "roll": roll,
-      }
-    elif data_type == 0xF3:
-      pitch, roll, yaw, zoom, focus, iris, _ = struct.unpack("<6H2s", data[2:16])
-      return {
-        "zoom": zoom,
-        "focus": focus,
-        "iris": iris,
-        "yaw": yaw,
-        "pitch": pitch,
-        "roll": roll,
-      }
+  def __init__(self, telemetry_hz=TELEMETRY_HZ):
+    self.odrv0 = None
+    self.ax = None
+    self.telemetry_hz = telemetry_hz
+    self._samples = collections.deque(maxlen=TELEMETRY_BACKLOG)
+    self._foc = None
+    # Last values written to the ODrive; None means unknown, so write it
+    self._state = None
+    self._control_mode = None
+    self._vel_limit = None
+    self._input_vel = None
+    self._lock = threading.Lock()
+    self._wake = threading.Event()
+    self._pending_vel = None
+    self._thread = None
 
-  def calibrate(self):
-    self.ax.controller.config.control_mode = ControlMode.VELOCITY_CONTROL
+  async def _io(self, func, *args):
+    # ODrive calls are blocking USB transfers; keep them off the event loop
+    return await asyncio.to_thread(func, *args)
 
-    request_state(self.ax, AxisState.CLOSED_LOOP_CONTROL)
+  async def _wait_for(self, condition):
+    while not await self._io(condition):
+      await asyncio.sleep(POLL_S)
 
-    self.ax.controller.input_vel = -3
+  async def _sweep(self, input_vel, progress):
+    await self._io(request_state, self.ax, AxisState.CLOSED_LOOP_CONTROL)
+    await self._io(setattr, self.ax.controller, "input_vel", input_vel)
+    progress("Moving %s..." % ("left" if input_vel < 0 else "right"))
+    # The axis drops to idle when it stalls against the end stop
+    await self._wait_for(lambda: self.ax.current_state == AxisState.IDLE)
+    await self._io(dump_errors, self.odrv0, True)
 
-    print("Moving left...")
-    while self.ax.current_state != AxisState.IDLE:
-      pass
-    print("Done")
+  def _still_homed(self, saved):
+    """True if the ODrive hasn't lost its position since saved was measured."""
+    if not saved or saved.get("serial") != self._serial():
+      return False
+    # After a reboot the axis comes up idle, and the position is no longer relative to the end stop
+    if self.ax.current_state != AxisState.CLOSED_LOOP_CONTROL:
+      return False
+    return 0 <= self.ax.pos_estimate <= saved["length"]
 
-    print(self.ax.pos_estimate)
+  def _serial(self):
+    return getattr(self.odrv0, "serial_number", None)
 
-    dump_errors(self.odrv0, clear = True)
+  def _stop(self):
+    self.ax.controller.input_vel = 0
+    request_state(self.ax, AxisState.IDLE)
 
-    self.ax.pos_estimate = 0
+  async def calibrate(self, saved=None, progress=print):
+    """
+    Home the sled and centre it, then start the worker. saved is a result of
+    an earlier calibrate(): if the ODrive has kept its position it is reused
+    outright, otherwise its rail length saves the sweep to the right. Returns
+    the calibration to save. Cancelling stops the sled; so does a failure,
+    which also forgets the ODrive so a retry looks for it again.
+    """
+    try:
+      if self.odrv0 is None:
+        progress("Looking for ODrive...")
+        self.odrv0 = await self._io(odrive.find_sync)
+        self.ax = self.odrv0.axis0
 
-    request_state(self.ax, AxisState.CLOSED_LOOP_CONTROL)
+      if await self._io(self._still_homed, saved):
+        progress("Sled position still valid, skipping calibration")
+        length = saved["length"]
+      else:
+        await self._io(setattr, self.ax.controller.config, "control_mode", ControlMode.VELOCITY_CONTROL)
+        await self._sweep(-3, progress)
+        await self._io(setattr, self.ax, "pos_estimate", 0)
+        if saved and saved.get("serial") == await self._io(self._serial):
+          length = saved["length"]
+          progress("Using saved rail length")
+        else:
+          await self._sweep(3, progress)
+          length = await self._io(getattr, self.ax, "pos_estimate")
 
-    self.ax.controller.input_vel = 3
+        # 29.26789093017578 is the number we expect which is 2.726m
+        print("Length:", length / POS_TO_METRES)
+        halfway = length / 2
 
-    print("Moving right...")
-    while self.ax.current_state != AxisState.IDLE:
-      pass
-    print("Done")
+        await self._io(setattr, self.ax.controller.config, "control_mode", ControlMode.POSITION_CONTROL)
+        await self._io(request_state, self.ax, AxisState.CLOSED_LOOP_CONTROL)
+        await self._io(setattr, self.ax.controller.config, "vel_limit", 3)
+        await self._io(setattr, self.ax.controller, "input_pos", halfway)
 
-    print(self.ax.pos_estimate)
+        progress("Centering...")
+        await self._wait_for(lambda: abs(self.ax.pos_estimate - halfway) <= 0.01 * POS_TO_METRES)
+        await self._io(dump_errors, self.odrv0)
 
-    dump_errors(self.odrv0, clear = True)
+      def finish():
+        self.ax.controller.config.control_mode = ControlMode.VELOCITY_CONTROL
+        self.ax.controller.config.vel_limit = VEL_LIMIT
+        self.ax.controller.input_vel = 0
+      await self._io(finish)
+    except asyncio.CancelledError:
+      if self.ax is not None:
+        await self._io(self._stop)
+      raise
+    except Exception:
+      # Leave the sled stopped, and look for the ODrive again next time in
+      # case it was unplugged
+      if self.ax is not None:
+        try:
+          await self._io(self._stop)
+        except Exception:
+          pass
+      self.odrv0 = None
+      self.ax = None
+      raise
 
-    # 29.26789093017578 is the number we expect which is 2.726m
+    self._state = AxisState.CLOSED_LOOP_CONTROL
+    self._control_mode = ControlMode.VELOCITY_CONTROL
+    self._vel_limit = VEL_LIMIT
+    self._input_vel = 0
+    self.start()
+    progress("Sled ready")
+    return {"serial": await self._io(self._serial), "length": length}
 
-    pos_m = self.ax.pos_estimate / POS_TO_METRES
-    pos_halfway = pos_m / 2
+  def _invalidate(self):
+    self._state = None
+    self._control_mode = None
+    self._vel_limit = None
+    self._input_vel = None
 
-    print("Length:", pos_m)
-    print("Halfway:", pos_halfway)
+  def _apply_velocity(self, input_vel):
+    """Write whatever differs from the cache; normally just input_vel, one USB round-trip."""
+    if self._control_mode != ControlMode.VELOCITY_CONTROL:
+      self.ax.controller.config.control_mode = ControlMode.VELOCITY_CONTROL
+      self._control_mode = ControlMode.VELOCITY_CONTROL
+    if self._vel_limit != VEL_LIMIT:
+      self.ax.controller.config.vel_limit = VEL_LIMIT
+      self._vel_limit = VEL_LIMIT
+    if self._state != AxisState.CLOSED_LOOP_CONTROL:
+      dump_errors(self.odrv0, clear = True)
+      request_state(self.ax, AxisState.CLOSED_LOOP_CONTROL)
+      self._state = AxisState.CLOSED_LOOP_CONTROL
+    if self._input_vel != input_vel:
+      self.ax.controller.input_vel = input_vel
+      self._input_vel = input_vel
 
-    self.ax.controller.config.control_mode = ControlMode.POSITION_CONTROL
-    request_state(self.ax, AxisState.CLOSED_LOOP_CONTROL)
+  def _check_state(self):
+    # An error drops the axis to idle; clear it and re-enter closed loop on the next write
+    if self.ax.current_state != AxisState.CLOSED_LOOP_CONTROL:
+      self._invalidate()
 
-    self.ax.controller.config.vel_limit = 3
-    self.ax.controller.input_pos = pos_halfway * POS_TO_METRES
+  def _sample(self, now):
+    # Four reads, one USB round-trip each; the object paths are resolved once
+    ax = self.ax
+    if self._foc is None:
+      self._foc = ax.motor.foc
+    sample = SledSample(
+      int(now * 1000) & 0xFFFFFFFF,
+      ax.pos_estimate / POS_TO_METRES,
+      ax.vel_estimate / POS_TO_METRES,
+      self._foc.Iq_measured,
+      ax.active_errors,
+    )
+    with self._lock:
+      self._samples.append(sample)
 
-    print("Centering...")
-    while abs(self.ax.pos_estimate - pos_halfway * POS_TO_METRES) > 0.01 * POS_TO_METRES:
-      pass
-    print("Done")
+  def take_samples(self):
+    """Return and forget the samples taken since the last call, oldest first."""
+    with self._lock:
+      samples = list(self._samples)
+      self._samples.clear()
+    return samples
 
-    dump_errors(self.odrv0)
+  def _worker(self):
+    target_vel = None
+    target_at = 0.0
+    next_check = time.monotonic() + STATE_CHECK_S
+    next_sample = time.monotonic()
+    while True:
+      due = next_check
+      if self.telemetry_hz:
+        due = min(due, next_sample)
+      if target_vel:
+        due = min(due, target_at + HOLD_S)
+      self._wake.wait(max(0, due - time.monotonic()))
+      with self._lock:
+        if self._pending_vel is not None:
+          target_vel = self._pending_vel
+          target_at = time.monotonic()
+          self._pending_vel = None
+        self._wake.clear()
+      if target_vel and time.monotonic() - target_at > HOLD_S:
+        # Control stopped arriving (lost stop frame, dropped link): don't keep the rail moving
+        print("Sled: no velocity for %.2f s, stopping" % HOLD_S)
+        target_vel = 0.0
+      try:
+        if time.monotonic() >= next_check:
+          next_check = time.monotonic() + STATE_CHECK_S
+          self._check_state()
+        if target_vel is not None:
+          # No I/O at all when nothing differs from the cache
+          self._apply_velocity(target_vel)
+        now = time.monotonic()
+        if self.telemetry_hz and now >= next_sample:
+          next_sample += 1 / self.telemetry_hz
+          if next_sample < now:
+            # Fell behind (USB stall); don't try to catch up with a burst
+            next_sample = now + 1 / self.telemetry_hz
+          self._sample(now)
+      except Exception as e:
+        print("Sled I/O error:", e)
+        self._invalidate()
 
-    self.ax.controller.config.control_mode = ControlMode.VELOCITY_CONTROL
-    self.ax.controller.config.vel_limit = 20
-    self.ax.controller.input_vel = 0
+  def start(self):
+    """Start the worker thread that owns the ODrive from now on."""
+    if self._thread is None:
+      with self._lock:
+        self._pending_vel = None
+      self._thread = threading.Thread(target=self._worker, name="sled", daemon=True)
+      self._thread.start()
 
   def set_velocity(self, input_vel):
-    self.ax.controller.input_vel = input_vel
-    dump_errors(self.odrv0, clear = True)
-    request_state(self.ax, AxisState.CLOSED_LOOP_CONTROL)
-    self.ax.controller.config.control_mode = ControlMode.VELOCITY_CONTROL
-    self.ax.controller.config.vel_limit = 20
+    """Post the latest velocity and return at once; an unsent older value is replaced."""
+    with self._lock:
+      self._pending_vel = input_vel
+      self._wake.set()
 
 if __name__ == "__main__":
   print("Calibrate...")
 
   sled = Sled()
-  sled.calibrate()
+  asyncio.run(sled.calibrate())
 
   print("Yoyo...")
 
   while 1:
-    sled.set_velocity(-1)
-    time.sleep(1)
-    sled.set_velocity(1)
-    time.sleep(1)
+    for vel in (-1, 1):
+      # Keep refreshing, or the worker stops the sled after HOLD_S
+      for _ in range(10):
+        sled.set_velocity(vel)
+        time.sleep(0.1)
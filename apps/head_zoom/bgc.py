@@ -1,26 +1,78 @@
-from machine import UART, Pin
 import struct
+from machine import Pin
+from ring_uart import RingUART
+from bgc_parser import BGCParser, build_frame, precompile_frame, crc16_update, read_u16, read_s16, MAX_PAYLOAD_SIZE, FRAME_OVERHEAD
 
 UART_ID = 1           # 0 or 1
 UART_BAUD = 115200
 BUFFER_SIZE = 1024
 
-PACKET_START = 0x24
-
+CMD_REALTIME_DATA_3 = 23
 CMD_SET_ADJ_VARS_VAL = 31
 CMD_API_VIRT_CH_CONTROL = 45
 CMD_CONTROL = 67
+CMD_REALTIME_DATA_CUSTOM = 88
 CMD_BEEP_SOUND = 89
 
+# CMD_REALTIME_DATA_CUSTOM data flags
+REALTIME_IMU_ANGLES = 1 << 0
+REALTIME_TARGET_ANGLES = 1 << 1
+
+ANGLE_UNIT = 0.02197265625  # degrees per LSB of a SimpleBGC angle
+
+# Gimbal telemetry packet sent to the controller over the unreliable channel:
+# header, type, timestamp_ms, state flags, IMU angles (roll, pitch, yaw),
+# target angles (roll, pitch, yaw), system error, battery level, motor power x3
+TELEMETRY_HEADER = 0xDE
+TELEMETRY_GIMBAL = 0xB1
+TELEMETRY_FORMAT = "<2BHB3h3hHH3B"
+TELEMETRY_SIZE = 24
+TELEMETRY_MOTORS_ON = 0x01
+TELEMETRY_STATE_VALID = 0x02
+
 def hexdump(data: bytes) -> str:
     """Return a hex dump string for given bytes."""
     return " ".join(f"{b:02X}" for b in data)
 
+# Commands whose payload never changes are framed once at import time
+FRAME_SET_GYRO_HEADING_ADJUSTMENT = precompile_frame(
+    CMD_SET_ADJ_VARS_VAL, bytes([0x01, 0x26, 0x00, 0x15, 0x00, 0x00]))
+FRAME_DISABLE_ANGLE_MODE = precompile_frame(CMD_CONTROL, bytes(15))
+FRAME_BEEP = precompile_frame(
+    CMD_BEEP_SOUND, bytes([0x02, 0x00, 0x00, 0x00, 0x00, 0x00,
+                           0x00, 0x00, 0x00, 0x00, 0x00, 0x00]))
+FRAME_REQUEST_REALTIME_ANGLES = precompile_frame(
+    CMD_REALTIME_DATA_CUSTOM,
+    struct.pack("<I", REALTIME_IMU_ANGLES | REALTIME_TARGET_ANGLES) + bytes(6))
+FRAME_REQUEST_REALTIME_STATE = precompile_frame(CMD_REALTIME_DATA_3, b"")
+
+class GimbalState:
+    """Latest realtime data decoded from the BGC."""
+
+    def __init__(self):
+        self.timestamp_ms = 0
+        self.imu_angles = [0, 0, 0]      # roll, pitch, yaw in ANGLE_UNIT
+        self.target_angles = [0, 0, 0]   # roll, pitch, yaw in ANGLE_UNIT
+        self.system_error = 0
+        self.bat_level = 0
+        self.motors_on = False
+        self.motor_power = [0, 0, 0]
+        self.state_valid = False  # set once a CMD_REALTIME_DATA_3 reply has been seen
+        self.updated = False      # set on every decoded reply, cleared by the consumer
+
 class BGC:
     """Encapsulate BGC UART communication and related helpers."""
 
     def __init__(self):
-        self.uart = UART(UART_ID, UART_BAUD, tx=Pin(8), rx=Pin(9))
+        self.uart = RingUART(UART_ID, UART_BAUD, tx=Pin(8), rx=Pin(9), rx_size=BUFFER_SIZE)
+        # Reusable frame buffer so send_cmd doesn't allocate per packet
+        self._tx_frame = bytearray(MAX_PAYLOAD_SIZE + FRAME_OVERHEAD)
+        self._tx_view = memoryview(self._tx_frame)
+        # Slice of _tx_view for the last frame length, kept so fixed-size commands don't allocate a view per send
+        self._tx_slice = self._tx_view[:0]
+        self.parser = BGCParser(self._on_frame)
+        self.state = GimbalState()
+        self._telemetry = bytearray(TELEMETRY_SIZE)
 
     def write_raw(self, data: bytes):
         # The "FCB Control Software" application discovers the correct COM port by sending data to all the COM ports.
@@ -32,91 +84,104 @@ class BGC:
         #     return
         self.uart.write(data)
 
+    def tx_busy(self):
+        """True while a previous frame is still being shifted out of the UART."""
+        return not self.uart.txdone()
+
     def read_raw(self, max_bytes: int = BUFFER_SIZE):
-        if self.uart.any():
-            data = self.uart.read(max_bytes)
-            return data
-        return None
+        return self.uart.read(max_bytes)
 
-    @staticmethod
-    def decode_udp_packet(data: bytes):
-        """Decode a 16-byte control packet into fields."""
-        if len(data) != 16:
-            print("Unexpected length:", len(data))
-            return None
-
-        if data[0] != 0xDE:
-            print("Invalid header:", data[0])
-            return None
-
-        data_type = data[1]
-
-        if data_type == 0xFD:
-            zoom, focus, iris, yaw, pitch, roll, _ = struct.unpack("<h5H2s", data[2:16])
-            return {
-                "zoom": zoom,
-                "focus": focus,
-                "iris": iris,
-                "yaw": yaw,
-                "pitch": pitch,
-                "roll": roll,
-            }
-        elif data_type == 0xF3:
-            pitch, roll, yaw, zoom, focus, iris, _ = struct.unpack("<6H2s", data[2:16])
-            return {
-                "zoom": zoom,
-                "focus": focus,
-                "iris": iris,
-                "yaw": yaw,
-                "pitch": pitch,
-                "roll": roll,
-            }
+    def readinto(self, buf):
+        """Copy buffered UART bytes into buf without allocating; return the count."""
+        return self.uart.readinto(buf)
 
     @staticmethod
     def crc16_calculate(data):
-        polynomial = 0x8005
-        crc_register = 0
-        for byte in data:
-            for shift_register in range(8):
-                data_bit = (byte >> shift_register) & 1
-                crc_bit = (crc_register >> 15) & 1
-                crc_register = (crc_register << 1) & 0xFFFF
-                if data_bit != crc_bit:
-                    crc_register ^= polynomial
-        return crc_register
+        return crc16_update(0, data, 0, len(data))
+
+    def _send_frame(self, command_id, payload_size):
+        length = build_frame(self._tx_frame, command_id, payload_size)
+        if len(self._tx_slice) != length:
+            self._tx_slice = self._tx_view[:length]
+        self.write_raw(self._tx_slice)
 
     def send_cmd(self, command_id, payload):
         payload_size = len(payload)
-        header_checksum = (command_id + payload_size) % 256
-        header = bytearray([command_id, payload_size, header_checksum])
-        header_and_payload = header + payload
-        crc = self.crc16_calculate(header_and_payload)
-        crc_bytes = bytearray([crc & 0xFF, (crc >> 8) & 0xFF])
-        packet = bytearray([PACKET_START]) + header_and_payload + crc_bytes
-        self.write_raw(packet)
+        self._tx_frame[4:4 + payload_size] = payload
+        self._send_frame(command_id, payload_size)
 
     # === High-level helpers corresponding to specific CMD_ values ===
 
     def set_gyro_heading_adjustment(self):
-        payload = bytearray([0x01, 0x26, 0x00, 0x15, 0x00, 0x00])
-        self.send_cmd(CMD_SET_ADJ_VARS_VAL, payload)
+        self.write_raw(FRAME_SET_GYRO_HEADING_ADJUSTMENT)
 
     def disable_angle_mode(self):
-        payload = bytearray([
-            0x00, 0x00, 0x00, 0x00,
-            0x00, 0x00, 0x00, 0x00,
-            0x00, 0x00, 0x00, 0x00,
-            0x00, 0x00, 0x00
-        ])
-        self.send_cmd(CMD_CONTROL, payload)
+        self.write_raw(FRAME_DISABLE_ANGLE_MODE)
 
     def beep(self):
-        payload = bytearray([0x02, 0x00, 0x00, 0x00, 0x00, 0x00,
-                             0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
-        self.send_cmd(CMD_BEEP_SOUND, payload)
+        self.write_raw(FRAME_BEEP)
 
     def send_joystick_control(self, yaw, pitch, roll):
-        payload = struct.pack(">3H", yaw, pitch, roll)
-        self.send_cmd(CMD_API_VIRT_CH_CONTROL, payload)
-
-
+        # CMD_API_VIRT_CH_CONTROL takes little-endian int16s
+        struct.pack_into("<3h", self._tx_frame, 4, yaw, pitch, roll)
+        self._send_frame(CMD_API_VIRT_CH_CONTROL, 6)
+
+    def request_realtime_angles(self):
+        self.write_raw(FRAME_REQUEST_REALTIME_ANGLES)
+
+    def request_realtime_state(self):
+        self.write_raw(FRAME_REQUEST_REALTIME_STATE)
+
+    # === Response handling ===
+
+    def parse(self, data, length=None):
+        """Feed bytes read from the BGC UART to the response parser."""
+        self.parser.feed(data, length)
+
+    def _on_frame(self, command_id, buf, size):
+        # Payload at buf[4:4 + size]; decoded by index so core 1 doesn't allocate
+        state = self.state
+        imu = state.imu_angles
+        target = state.target_angles
+        if command_id == CMD_REALTIME_DATA_CUSTOM and size >= 14:
+            state.timestamp_ms = read_u16(buf, 4)
+            imu[0] = read_s16(buf, 6)
+            imu[1] = read_s16(buf, 8)
+            imu[2] = read_s16(buf, 10)
+            target[0] = read_s16(buf, 12)
+            target[1] = read_s16(buf, 14)
+            target[2] = read_s16(buf, 16)
+            state.updated = True
+        elif command_id == CMD_REALTIME_DATA_3 and size >= 63:
+            state.system_error = read_u16(buf, 18)
+            imu[0] = read_s16(buf, 36)
+            imu[1] = read_s16(buf, 38)
+            imu[2] = read_s16(buf, 40)
+            target[0] = read_s16(buf, 48)
+            target[1] = read_s16(buf, 50)
+            target[2] = read_s16(buf, 52)
+            state.bat_level = read_u16(buf, 59)
+            state.motors_on = bool(buf[61] & 0x01)
+            state.motor_power[0] = buf[64]
+            state.motor_power[1] = buf[65]
+            state.motor_power[2] = buf[66]
+            state.state_valid = True
+            state.updated = True
+
+    def encode_telemetry(self):
+        """Pack the latest gimbal state into the reusable telemetry packet and return it."""
+        state = self.state
+        flags = 0
+        if state.motors_on:
+            flags |= TELEMETRY_MOTORS_ON
+        if state.state_valid:
+            flags |= TELEMETRY_STATE_VALID
+        imu = state.imu_angles
+        target = state.target_angles
+        power = state.motor_power
+        struct.pack_into(TELEMETRY_FORMAT, self._telemetry, 0,
+                         TELEMETRY_HEADER, TELEMETRY_GIMBAL, state.timestamp_ms, flags,
+                         imu[0], imu[1], imu[2], target[0], target[1], target[2],
+                         state.system_error, state.bat_level, power[0], power[1], power[2])
+        state.updated = False
+        return self._telemetry
@@ -0,0 +1,170 @@
+# SimpleBGC serial protocol v2 framing, shared by the heads' BGC drivers:
+# frame = '$', command id, payload size, header checksum (id + size), payload,
+# CRC16 over id..payload (little-endian). The CRC is table-driven, through a
+# viper loop where the port has the emitter.
+from array import array
+from byte_copy import copy
+
+try:
+    import micropython
+except ImportError:
+    micropython = None
+
+PACKET_START = 0x24
+CRC_POLYNOMIAL = 0x8005
+MAX_PAYLOAD_SIZE = 255
+FRAME_OVERHEAD = 6    # start byte, 3-byte header, 2-byte CRC
+
+def _reflect8(value):
+    result = 0
+    for _ in range(8):
+        result = (result << 1) | (value & 1)
+        value >>= 1
+    return result
+
+def _build_crc_table():
+    table = array("H", [0] * 256)
+    for index in range(256):
+        crc = index << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ CRC_POLYNOMIAL) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+        table[index] = crc
+    return table
+
+# SimpleBGC feeds each byte LSB first into an MSB-first register, so the table
+# is indexed with the bit-reversed byte.
+_CRC_TABLE = _build_crc_table()
+_REFLECT8 = bytes(_reflect8(i) for i in range(256))
+
+def _crc16_update_py(crc, buf, start, end):
+    table = _CRC_TABLE
+    reflect = _REFLECT8
+    for i in range(start, end):
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ reflect[buf[i]]]
+    return crc
+
+crc16_update = _crc16_update_py
+
+if micropython is not None:
+    try:
+        @micropython.viper
+        def _crc16_update_viper(crc: int, buf, start: int, end: int) -> int:
+            table = ptr16(_CRC_TABLE)
+            reflect = ptr8(_REFLECT8)
+            data = ptr8(buf)
+            i = start
+            while i < end:
+                crc = ((crc << 8) & 0xFFFF) ^ table[((crc >> 8) ^ reflect[data[i]]) & 0xFF]
+                i += 1
+            return crc
+
+        crc16_update = _crc16_update_viper
+    except Exception:
+        # Port built without the viper emitter
+        pass
+
+def read_u16(buf, offset):
+    """Little-endian uint16 at buf[offset]; unlike struct.unpack_from, no tuple is allocated."""
+    return buf[offset] | (buf[offset + 1] << 8)
+
+def read_s16(buf, offset):
+    """Little-endian int16 at buf[offset]."""
+    value = buf[offset] | (buf[offset + 1] << 8)
+    return value - 0x10000 if value & 0x8000 else value
+
+def build_frame(buf, command_id, payload_size):
+    """Complete a frame in place whose payload is already at buf[4:]; return its length."""
+    buf[0] = PACKET_START
+    buf[1] = command_id
+    buf[2] = payload_size
+    buf[3] = (command_id + payload_size) & 0xFF
+    end = 4 + payload_size
+    crc = crc16_update(0, buf, 1, end)
+    buf[end] = crc & 0xFF
+    buf[end + 1] = (crc >> 8) & 0xFF
+    return end + 2
+
+def precompile_frame(command_id, payload):
+    """Return the complete wire frame for a command with a constant payload."""
+    buf = bytearray(len(payload) + FRAME_OVERHEAD)
+    buf[4:4 + len(payload)] = payload
+    build_frame(buf, command_id, len(payload))
+    return bytes(buf)
+
+class BGCParser:
+    """Incrementally frame and CRC-check SimpleBGC v2 frames from a UART byte stream."""
+
+    def __init__(self, on_frame):
+        # called with (command_id, frame buffer, payload size); the payload
+        # starts at offset 4 and is only valid during the call
+        self.on_frame = on_frame
+        self._buf = bytearray(MAX_PAYLOAD_SIZE + FRAME_OVERHEAD)
+        self._pos = 0
+        self._frame_len = 0
+        self.frames = 0
+        self.header_errors = 0
+        self.crc_errors = 0
+
+    def reset(self):
+        self._pos = 0
+        self._frame_len = 0
+
+    def feed(self, data, length=None):
+        """Consume bytes, calling on_frame for every complete and valid frame."""
+        if length is None:
+            length = len(data)
+        buf = self._buf
+        i = 0
+        while i < length:
+            pos = self._pos
+            if pos == 0:
+                # Hunt for the start byte
+                if data[i] == PACKET_START:
+                    buf[0] = PACKET_START
+                    self._pos = 1
+                i += 1
+            elif pos < 4:
+                buf[pos] = data[i]
+                i += 1
+                pos += 1
+                self._pos = pos
+                if pos == 4:
+                    if (buf[1] + buf[2]) & 0xFF != buf[3]:
+                        self.header_errors += 1
+                        self._resync()
+                    else:
+                        self._frame_len = buf[2] + FRAME_OVERHEAD
+            else:
+                # Payload and CRC: copy as much as is available in one go
+                count = min(self._frame_len - pos, length - i)
+                copy(buf, pos, data, i, count)
+                i += count
+                pos += count
+                self._pos = pos
+                if pos == self._frame_len:
+                    self._complete()
+
+    def _resync(self):
+        # A bad header may have swallowed the start of a real frame; restart from the next start byte
+        buf = self._buf
+        for k in range(1, 4):
+            if buf[k] == PACKET_START:
+                for j in range(k, 4):
+                    buf[j - k] = buf[j]
+                self._pos = 4 - k
+                return
+        self.reset()
+
+    def _complete(self):
+        size = self._buf[2]
+        end = 4 + size
+        crc = crc16_update(0, self._buf, 1, end)
+        self.reset()
+        if self._buf[end] != crc & 0xFF or self._buf[end + 1] != (crc >> 8) & 0xFF:
+            self.crc_errors += 1
+            return
+        self.frames += 1
+        self.on_frame(self._buf[1], self._buf, size)
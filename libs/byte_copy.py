@@ -0,0 +1,39 @@
+# Allocation-free byte copy for the heads' hot paths.
+#
+# On MicroPython, slicing a bytearray or memoryview creates a new object, so
+# "dst[a:b] = src[c:d]" allocates. copy() moves the bytes by index instead,
+# through a viper loop where the port has the emitter. Overlapping ranges are
+# safe when dst_off <= src_off within the same buffer (moving data forward).
+
+try:
+    import micropython
+except ImportError:
+    micropython = None
+
+def _copy_py(dst, dst_off, src, src_off, count):
+    for i in range(count):
+        dst[dst_off + i] = src[src_off + i]
+
+def _copy_slice(dst, dst_off, src, src_off, count):
+    # CPython (controller): allocation doesn't matter there, a per-byte loop does
+    dst[dst_off:dst_off + count] = src[src_off:src_off + count]
+
+copy = _copy_py
+
+if micropython is None:
+    copy = _copy_slice
+else:
+    try:
+        @micropython.viper
+        def _copy_viper(dst, dst_off: int, src, src_off: int, count: int):
+            d = ptr8(dst)
+            s = ptr8(src)
+            i = 0
+            while i < count:
+                d[dst_off + i] = s[src_off + i]
+                i += 1
+
+        copy = _copy_viper
+    except Exception:
+        # Port built without the viper emitter
+        pass
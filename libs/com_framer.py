@@ -0,0 +1,126 @@
+# Frame-aware coalescing for the COM_DATA serial bridge.
+#
+# Bytes read from a serial port are fed in as they arrive; the framer marks the
+# prefix of its buffer that holds whole protocol frames as ready, so each
+# COM_DATA message carries complete frames instead of whatever one read returned.
+# Bytes that don't parse as a frame are passed through as soon as they are seen,
+# and a partial frame is released by flush() once the line has been idle for
+# idle_ms, so a corrupt length or a foreign protocol can't stall the tunnel.
+#
+# Runs on both MicroPython (heads) and CPython (controller). Bytes are copied
+# by index (byte_copy), so feeding and consuming don't allocate.
+
+from byte_copy import copy
+
+PROTOCOL_BGC = "bgc"        # SimpleBGC v2: '$' cmd size hdr_crc payload crc16
+PROTOCOL_VISCA = "camera"   # VISCA: messages end with 0xFF
+PROTOCOL_RAW = "raw"        # No framing; every byte is ready immediately
+
+BGC_START = 0x24
+BGC_HEADER_SIZE = 4
+BGC_CRC_SIZE = 2
+VISCA_TERMINATOR = 0xFF
+
+FRAMER_SIZE = 512
+IDLE_MS = 5                 # Inter-byte gap after which a partial frame is sent anyway
+
+class Framer:
+    """Accumulate serial bytes and expose the leading run of complete frames."""
+
+    def __init__(self, protocol, size=FRAMER_SIZE, idle_ms=IDLE_MS):
+        self.protocol = protocol
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.idle_ms = idle_ms
+        self.length = 0   # bytes held
+        self.ready = 0    # bytes at the front that form complete frames
+        self.frames = 0
+        self.flushes = 0
+
+    def pending(self):
+        """Bytes held beyond the ready prefix (an incomplete frame)."""
+        return self.length - self.ready
+
+    def feed(self, data, count=None, start=0):
+        """Copy up to count bytes of data[start:] in; return how many were accepted.
+
+        If the buffer is full the held bytes are flushed to ready and fewer than
+        count bytes are accepted; the caller should drain ready and feed the rest.
+        """
+        if count is None:
+            count = len(data) - start
+        room = len(self.buf) - self.length
+        if count > room:
+            if self.ready == 0 and room == 0:
+                # One oversized partial frame fills the buffer; send it as is
+                self.flush()
+                return 0
+            count = room
+        copy(self.buf, self.length, data, start, count)
+        self.length += count
+        self._scan()
+        return count
+
+    def consume(self, count):
+        """Drop count bytes from the front after they have been sent."""
+        remaining = self.length - count
+        if remaining > 0:
+            copy(self.buf, 0, self.buf, count, remaining)
+        self.length = remaining
+        self.ready -= count
+        if self.ready < 0:
+            self.ready = 0
+
+    def flush(self):
+        """Mark everything held as ready, complete frame or not."""
+        if self.length > self.ready:
+            self.flushes += 1
+        self.ready = self.length
+
+    def reset(self):
+        self.length = 0
+        self.ready = 0
+
+    def _scan(self):
+        if self.protocol == PROTOCOL_BGC:
+            self._scan_bgc()
+        elif self.protocol == PROTOCOL_VISCA:
+            self._scan_visca()
+        else:
+            self.ready = self.length
+
+    def _scan_visca(self):
+        buf = self.buf
+        end = self.ready
+        i = end
+        while i < self.length:
+            if buf[i] == VISCA_TERMINATOR:
+                end = i + 1
+                self.frames += 1
+            i += 1
+        self.ready = end
+
+    def _scan_bgc(self):
+        buf = self.buf
+        pos = self.ready
+        length = self.length
+        while pos < length:
+            if buf[pos] != BGC_START:
+                # Not the start of a frame: let it through on its own
+                pos += 1
+                self.ready = pos
+                continue
+            if length - pos < BGC_HEADER_SIZE:
+                break
+            size = buf[pos + 2]
+            if (buf[pos + 1] + size) & 0xFF != buf[pos + 3]:
+                # Stray '$' rather than a header
+                pos += 1
+                self.ready = pos
+                continue
+            total = BGC_HEADER_SIZE + size + BGC_CRC_SIZE
+            if length - pos < total:
+                break
+            pos += total
+            self.ready = pos
+            self.frames += 1
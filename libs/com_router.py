@@ -0,0 +1,132 @@
+# Protocol-checking router for the controller side of the COM_DATA bridge.
+#
+# Serial tools don't always write to the right port: the FCB Control Software
+# finds the camera by sending VISCA to every COM port, so without a check its
+# probes cross the network and end up on the gimbal UART. A ComRouter
+# accepts only whole, valid frames:
+#   SimpleBGC v2: '$', cmd, size, header checksum (cmd + size), payload,
+#                 CRC16 (poly 0x8005, from libs/bgc_parser.py)
+#   VISCA:        address byte (0x80-0xFE), 1-14 bytes below 0x80, 0xFF
+# A frame of the other protocol is dropped as misdirected, or passed to the
+# other target if reroute is set. Any other byte is dropped. Each router
+# counts what it dropped so every port can report it.
+
+from com_framer import PROTOCOL_BGC, PROTOCOL_VISCA, BGC_START, BGC_HEADER_SIZE, BGC_CRC_SIZE, VISCA_TERMINATOR
+from bgc_parser import crc16_update
+
+VISCA_MIN_SIZE = 3
+VISCA_MAX_SIZE = 16
+REPORT_INTERVAL_S = 1.0
+
+_NEED_MORE = -1
+_JUNK = 0
+
+def _bgc_frame(buf, length):
+    """Size of the valid SimpleBGC frame at the front of buf, _NEED_MORE or _JUNK."""
+    if length < BGC_HEADER_SIZE:
+        return _NEED_MORE
+    size = buf[2]
+    if (buf[1] + size) & 0xFF != buf[3]:
+        return _JUNK
+    total = BGC_HEADER_SIZE + size + BGC_CRC_SIZE
+    if length < total:
+        return _NEED_MORE
+    crc = crc16_update(0, buf, 1, total - BGC_CRC_SIZE)
+    if buf[total - 2] != crc & 0xFF or buf[total - 1] != crc >> 8:
+        return _JUNK
+    return total
+
+def _visca_frame(buf, length):
+    """Size of the valid VISCA message at the front of buf, _NEED_MORE or _JUNK."""
+    for i in range(1, min(length, VISCA_MAX_SIZE)):
+        byte = buf[i]
+        if byte == VISCA_TERMINATOR:
+            return i + 1 if i + 1 >= VISCA_MIN_SIZE else _JUNK
+        if byte & 0x80:
+            return _JUNK
+    return _NEED_MORE if length < VISCA_MAX_SIZE else _JUNK
+
+class ComRouter:
+    """Sort the bytes read for one COM_DATA target into frames for it, frames for the other target, and drops."""
+
+    def __init__(self, target, reroute=False):
+        self.target = target
+        self.other = PROTOCOL_VISCA if target == PROTOCOL_BGC else PROTOCOL_BGC
+        self.reroute = reroute
+        self.buf = bytearray()
+        self.out = {PROTOCOL_BGC: bytearray(), PROTOCOL_VISCA: bytearray()}
+        self.frames = 0
+        self.dropped_bytes = 0   # bytes that weren't part of any valid frame
+        self.misdirected = 0     # valid frames of the other protocol
+        self.rerouted = 0        # of those, frames passed to the other target
+        self._reported = (0, 0)
+        self._reported_at = None
+
+    def feed(self, data):
+        """Take received bytes in; complete frames become available from take()."""
+        buf = self.buf
+        buf += data
+        pos = 0
+        length = len(buf)
+        while pos < length:
+            view = memoryview(buf)[pos:length]
+            first = buf[pos]
+            if first == BGC_START:
+                protocol = PROTOCOL_BGC
+                size = _bgc_frame(view, length - pos)
+            elif first & 0x80 and first != VISCA_TERMINATOR:
+                protocol = PROTOCOL_VISCA
+                size = _visca_frame(view, length - pos)
+            else:
+                protocol = None
+                size = _JUNK
+            view.release()
+            if size == _NEED_MORE:
+                break
+            if size == _JUNK:
+                self.dropped_bytes += 1
+                pos += 1
+                continue
+            if protocol == self.target:
+                self.frames += 1
+                self.out[protocol] += buf[pos:pos + size]
+            else:
+                self.misdirected += 1
+                if self.reroute:
+                    self.rerouted += 1
+                    self.out[protocol] += buf[pos:pos + size]
+            pos += size
+        del buf[:pos]
+
+    def pending(self):
+        """Bytes held as the start of an incomplete frame."""
+        return len(self.buf)
+
+    def idle(self):
+        """The line went quiet: a partial frame held now will never complete, so drop it."""
+        self.dropped_bytes += len(self.buf)
+        self.buf.clear()
+
+    def reset(self):
+        self.buf.clear()
+
+    def take(self, target):
+        """Return and clear the frames routed to target (b"" if none)."""
+        out = self.out[target]
+        if not out:
+            return b""
+        data = bytes(out)
+        out.clear()
+        return data
+
+    def report(self, name, now, interval=REPORT_INTERVAL_S):
+        """A line describing the drops so far if there are new ones and interval has passed, else None."""
+        counts = (self.dropped_bytes, self.misdirected)
+        if counts == self._reported:
+            return None
+        if self._reported_at is not None and now - self._reported_at < interval:
+            return None
+        self._reported = counts
+        self._reported_at = now
+        return (f"{name}: {self.dropped_bytes} stray bytes dropped, "
+                f"{self.misdirected} misdirected frames ({self.rerouted} rerouted) so far")
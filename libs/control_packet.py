@@ -0,0 +1,241 @@
+# Codec for the 16-byte control packet the controller streams to heads over
+# the unreliable channel. This is the single definition of the wire format;
+# the controller, the heads and the equipoise rail all use it.
+#
+# 0xFD: header, type, zoom (int16 LE), focus, iris (uint16 BE),
+#       yaw, pitch, roll (int16 BE), 2 reserved bytes
+# 0xF3 (legacy, test/head_controller.py): header, type, pitch, roll, yaw
+#       (int16 BE), zoom, focus, iris (uint16 BE), 2 reserved bytes
+# 0xFC (delta): header, type, field mask, then each flagged field in 0xFD
+#       order as 16-bit BE (focus and iris unsigned, the rest signed), so
+#       3 to 15 bytes. Fields not flagged keep their previous value.
+#
+# DeltaEncoder sends 0xFC frames as fields change, plus a full 0xFD
+# heartbeat that resyncs a receiver that lost a delta or just started. The
+# heartbeat stays on the active interval until a full frame has carried the
+# return to rest, so a lost stop delta is repaired within HEARTBEAT_ACTIVE_MS.
+#
+# Decoding writes into a reusable object instead of returning a dict. On
+# MicroPython, where struct.unpack_from would allocate a tuple per packet and
+# there is no struct.Struct, the fields are assembled from the bytes directly.
+try:
+    import ustruct as struct
+    MICROPYTHON = True
+except ImportError:
+    import struct
+    MICROPYTHON = False
+
+HEADER = 0xDE
+TYPE_CONTROL = 0xFD
+TYPE_CONTROL_LEGACY = 0xF3
+TYPE_CONTROL_DELTA = 0xFC
+PACKET_SIZE = 16
+DELTA_HEADER_SIZE = 3
+
+# Delta field mask bits, in wire order
+FIELD_ZOOM = 0x01
+FIELD_FOCUS = 0x02
+FIELD_IRIS = 0x04
+FIELD_YAW = 0x08
+FIELD_PITCH = 0x10
+FIELD_ROLL = 0x20
+FIELDS_ALL = 0x3F
+
+DEADBAND = (2, 0, 0, 2, 2, 2)   # per field, in wire order; focus/iris are already coarse
+HEARTBEAT_ACTIVE_MS = 100       # full frame interval while anything is moving
+HEARTBEAT_IDLE_MS = 1000        # full frame interval while zoom/yaw/pitch/roll are all zero
+
+if not MICROPYTHON:
+    _FD_ZOOM = struct.Struct("<h")
+    _FD_BODY = struct.Struct(">2H3h")
+    _F3_BODY = struct.Struct(">3h3H")
+
+class ControlFields:
+    """Reusable decode target; any object with these attributes will do."""
+    __slots__ = ("zoom", "focus", "iris", "yaw", "pitch", "roll")
+
+    def __init__(self):
+        self.zoom = 0
+        self.focus = 0
+        self.iris = 0
+        self.yaw = 0
+        self.pitch = 0
+        self.roll = 0
+
+    def as_dict(self):
+        return {
+            "zoom": self.zoom,
+            "focus": self.focus,
+            "iris": self.iris,
+            "yaw": self.yaw,
+            "pitch": self.pitch,
+            "roll": self.roll,
+        }
+
+def _s16(value):
+    return ((value + 0x8000) & 0xFFFF) - 0x8000
+
+def _u16(value):
+    return value & 0xFFFF
+
+def encode_into(buf, zoom, focus, iris, yaw, pitch, roll):
+    """Write a 0xFD packet into buf (at least PACKET_SIZE bytes); values wrap to 16 bits."""
+    buf[0] = HEADER
+    buf[1] = TYPE_CONTROL
+    if MICROPYTHON:
+        struct.pack_into("<h", buf, 2, _s16(zoom))
+        struct.pack_into(">2H3h", buf, 4, _u16(focus), _u16(iris), _s16(yaw), _s16(pitch), _s16(roll))
+    else:
+        _FD_ZOOM.pack_into(buf, 2, _s16(zoom))
+        _FD_BODY.pack_into(buf, 4, _u16(focus), _u16(iris), _s16(yaw), _s16(pitch), _s16(roll))
+    buf[14] = 0
+    buf[15] = 0
+    return buf
+
+def encode(zoom, focus, iris, yaw, pitch, roll):
+    """Return a new 0xFD packet."""
+    return bytes(encode_into(bytearray(PACKET_SIZE), zoom, focus, iris, yaw, pitch, roll))
+
+def encode_delta_into(buf, mask, zoom, focus, iris, yaw, pitch, roll):
+    """Write a 0xFC packet carrying the fields in mask into buf; return its length."""
+    buf[0] = HEADER
+    buf[1] = TYPE_CONTROL_DELTA
+    buf[2] = mask
+    i = DELTA_HEADER_SIZE
+    bit = 1
+    for value in (zoom, focus, iris, yaw, pitch, roll):
+        if mask & bit:
+            value = _u16(value)
+            buf[i] = value >> 8
+            buf[i + 1] = value & 0xFF
+            i += 2
+        bit <<= 1
+    return i
+
+class DeltaEncoder:
+    """Turn sampled control values into 0xFC deltas and 0xFD heartbeats."""
+
+    def __init__(self, deadband=DEADBAND, active_ms=HEARTBEAT_ACTIVE_MS, idle_ms=HEARTBEAT_IDLE_MS):
+        self.deadband = deadband
+        self.active_ms = active_ms
+        self.idle_ms = idle_ms
+        self._buf = bytearray(PACKET_SIZE)
+        self.reset()
+
+    def reset(self):
+        """Forget what was sent, so the next update() is a full frame."""
+        self.sent = None
+        self.sent_ms = 0
+        self.full_moving = False    # last full frame had zoom/yaw/pitch/roll non-zero
+
+    def update(self, now_ms, zoom, focus, iris, yaw, pitch, roll):
+        """Return the packet to send for these values at now_ms, or None if nothing is due."""
+        values = (zoom, focus, iris, yaw, pitch, roll)
+        sent = self.sent
+        if sent is not None:
+            moving = sent[0] or sent[3] or sent[4] or sent[5]
+            interval = self.active_ms if moving or self.full_moving else self.idle_ms
+            if now_ms - self.sent_ms < interval:
+                mask = 0
+                bit = 1
+                for i in range(6):
+                    value = values[i]
+                    last = sent[i]
+                    # A return to zero is always sent, so the head stops exactly
+                    if value != last and (abs(value - last) > self.deadband[i] or value == 0):
+                        mask |= bit
+                    bit <<= 1
+                if not mask:
+                    return None
+                self.sent = tuple(values[i] if mask & (1 << i) else sent[i] for i in range(6))
+                count = encode_delta_into(self._buf, mask, *values)
+                return bytes(self._buf[:count])
+        self.sent = values
+        self.sent_ms = now_ms
+        self.full_moving = bool(zoom or yaw or pitch or roll)
+        return bytes(encode_into(self._buf, *values))
+
+def _be_s16(data, i):
+    value = (data[i] << 8) | data[i + 1]
+    if value & 0x8000:
+        value -= 0x10000
+    return value
+
+def _be_u16(data, i):
+    return (data[i] << 8) | data[i + 1]
+
+def _decode_delta(data, out, offset, length):
+    mask = data[offset + 2]
+    if mask & ~FIELDS_ALL:
+        return 0
+    size = DELTA_HEADER_SIZE
+    bits = mask
+    while bits:
+        size += 2 * (bits & 1)
+        bits >>= 1
+    if length != size:
+        return 0
+    i = offset + DELTA_HEADER_SIZE
+    if mask & FIELD_ZOOM:
+        out.zoom = _be_s16(data, i)
+        i += 2
+    if mask & FIELD_FOCUS:
+        out.focus = _be_u16(data, i)
+        i += 2
+    if mask & FIELD_IRIS:
+        out.iris = _be_u16(data, i)
+        i += 2
+    if mask & FIELD_YAW:
+        out.yaw = _be_s16(data, i)
+        i += 2
+    if mask & FIELD_PITCH:
+        out.pitch = _be_s16(data, i)
+        i += 2
+    if mask & FIELD_ROLL:
+        out.roll = _be_s16(data, i)
+    return TYPE_CONTROL_DELTA
+
+def decode_into(data, out, offset=0, length=None):
+    """
+    Decode the packet at data[offset:] into out's fields. Returns the packet
+    type, or 0 if it isn't a control packet. A delta only updates the fields
+    it carries, so out must hold the previous state.
+    """
+    if length is None:
+        length = len(data) - offset
+    if length < DELTA_HEADER_SIZE or data[offset] != HEADER:
+        return 0
+    packet_type = data[offset + 1]
+    if packet_type == TYPE_CONTROL_DELTA:
+        return _decode_delta(data, out, offset, length)
+    if length != PACKET_SIZE:
+        return 0
+    if MICROPYTHON:
+        if packet_type == TYPE_CONTROL:
+            zoom = data[offset + 2] | (data[offset + 3] << 8)
+            if zoom & 0x8000:
+                zoom -= 0x10000
+            out.zoom = zoom
+            out.focus = _be_u16(data, offset + 4)
+            out.iris = _be_u16(data, offset + 6)
+            out.yaw = _be_s16(data, offset + 8)
+            out.pitch = _be_s16(data, offset + 10)
+            out.roll = _be_s16(data, offset + 12)
+            return packet_type
+        if packet_type == TYPE_CONTROL_LEGACY:
+            out.pitch = _be_s16(data, offset + 2)
+            out.roll = _be_s16(data, offset + 4)
+            out.yaw = _be_s16(data, offset + 6)
+            out.zoom = _be_u16(data, offset + 8)
+            out.focus = _be_u16(data, offset + 10)
+            out.iris = _be_u16(data, offset + 12)
+            return packet_type
+        return 0
+    if packet_type == TYPE_CONTROL:
+        out.zoom, = _FD_ZOOM.unpack_from(data, offset + 2)
+        out.focus, out.iris, out.yaw, out.pitch, out.roll = _FD_BODY.unpack_from(data, offset + 4)
+        return packet_type
+    if packet_type == TYPE_CONTROL_LEGACY:
+        out.pitch, out.roll, out.yaw, out.zoom, out.focus, out.iris = _F3_BODY.unpack_from(data, offset + 2)
+        return packet_type
+    return 0
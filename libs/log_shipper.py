@@ -0,0 +1,142 @@
+# Buffered, rate-limited log shipping over the signalling websocket.
+#
+# push() is cheap and never touches the network: it drops the message if its
+# level is over its rate budget, otherwise stores it in a fixed-size ring
+# (overwriting the oldest entry when full). run() is a background task that
+# periodically packs whatever is queued into one PRINTF message and sends it,
+# adding a line with the drop counters whenever they have moved.
+try:
+    import uasyncio as asyncio
+    import utime as time_module
+    MICROPYTHON = True
+except ImportError:
+    import asyncio
+    import time as time_module
+    MICROPYTHON = False
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+# Messages per second and burst size allowed for each level
+DEFAULT_RATES = {
+    DEBUG: (5, 10),
+    INFO: (10, 20),
+    WARNING: (20, 40),
+    ERROR: (20, 40),
+}
+
+LOG_CAPACITY = 64        # Messages held while waiting to be shipped
+SHIP_INTERVAL_MS = 200   # How often queued messages are sent
+BATCH_CHARS = 1024       # Soft cap on the text sent in one PRINTF message
+
+def _ticks_ms():
+    if MICROPYTHON:
+        return time_module.ticks_ms()
+    return int(time_module.monotonic() * 1000)
+
+def _ticks_diff(a, b):
+    if MICROPYTHON:
+        return time_module.ticks_diff(a, b)
+    return a - b
+
+class _TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last_ms = _ticks_ms()
+
+    def take(self):
+        now = _ticks_ms()
+        elapsed = _ticks_diff(now, self.last_ms)
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate / 1000)
+            self.last_ms = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+class LogShipper:
+    """Fixed-size log ring drained by a background task in batches."""
+
+    def __init__(self, capacity=LOG_CAPACITY, rates=None, interval_ms=SHIP_INTERVAL_MS, batch_chars=BATCH_CHARS):
+        self.ring = [None] * capacity
+        self.head = 0
+        self.count = 0
+        self.interval_ms = interval_ms
+        self.batch_chars = batch_chars
+        self.buckets = {}
+        for level, (rate, burst) in (rates or DEFAULT_RATES).items():
+            self.buckets[level] = _TokenBucket(rate, burst)
+        self.dropped_overflow = 0
+        self.dropped_rate = 0
+        self._reported_overflow = 0
+        self._reported_rate = 0
+
+    def push(self, level, message):
+        """Queue a message; returns False if it was rate limited."""
+        bucket = self.buckets.get(level)
+        if bucket is not None and not bucket.take():
+            self.dropped_rate += 1
+            return False
+        capacity = len(self.ring)
+        if self.count == capacity:
+            # Overwrite the oldest entry
+            self.dropped_overflow += 1
+            self.head = (self.head + 1) % capacity
+            self.count -= 1
+        self.ring[(self.head + self.count) % capacity] = message
+        self.count += 1
+        return True
+
+    def clear(self):
+        for i in range(len(self.ring)):
+            self.ring[i] = None
+        self.head = 0
+        self.count = 0
+
+    def take_batch(self):
+        """Remove queued messages up to batch_chars and return them as one string, or None."""
+        lines = []
+        size = 0
+        capacity = len(self.ring)
+        while self.count and (not lines or size + len(self.ring[self.head]) <= self.batch_chars):
+            message = self.ring[self.head]
+            self.ring[self.head] = None
+            self.head = (self.head + 1) % capacity
+            self.count -= 1
+            lines.append(message)
+            size += len(message) + 1
+        if self.dropped_overflow != self._reported_overflow or self.dropped_rate != self._reported_rate:
+            lines.append("[log] dropped %d (buffer full), %d (rate limited)" % (
+                self.dropped_overflow - self._reported_overflow, self.dropped_rate - self._reported_rate))
+            self._reported_overflow = self.dropped_overflow
+            self._reported_rate = self.dropped_rate
+        if not lines:
+            return None
+        return "\n".join(lines)
+
+    def _pending(self):
+        return self.count or self.dropped_overflow != self._reported_overflow or self.dropped_rate != self._reported_rate
+
+    async def run(self, send, can_send=None):
+        """Ship batches forever.
+
+        send(text) is an async callable; can_send() returns False while there is
+        no socket, in which case messages stay queued (and the ring overwrites
+        the oldest ones).
+        """
+        while True:
+            await asyncio.sleep(self.interval_ms / 1000)
+            if can_send is not None and not can_send():
+                continue
+            while self._pending():
+                text = self.take_batch()
+                if text is None:
+                    break
+                await send(text)
+                # Let other tasks run between batches
+                await asyncio.sleep(0)
@@ -1,18 +1,171 @@
-# minimal logging shim for MicroPython
+# Minimal leveled logging core for MicroPython (a subset of the stdlib API).
+#
+# Loggers are cached by name. The level check happens before anything is
+# formatted, so a disabled LOGGER.debug("x %s", y) costs one comparison.
+# Records are (level, name, msg, args) tuples; they are only formatted by the
+# sinks that need text. Sinks are callables taking a record and are added with
+# add_sink(); by default records go to the UART console.
 
+NOTSET = 0
 DEBUG = 10
 INFO = 20
 WARNING = 30
 ERROR = 40
 CRITICAL = 50
 
-def getLogger(name=None):
-    return Logger()
+_LEVEL_NAMES = {
+    DEBUG: "DEBUG",
+    INFO: "INFO",
+    WARNING: "WARN",
+    ERROR: "ERROR",
+    CRITICAL: "CRIT",
+}
+
+# Bound at import so console output doesn't go through an app's networked print
+# override (apps import this module, via udp_con, before installing one)
+_console_print = print
+
+# [root level, disable floor]; a list so loggers can read them without globals
+_state = [INFO, NOTSET]
+_loggers = {}
+_sinks = []
+
+def getLevelName(level):
+    return _LEVEL_NAMES.get(level, "L%d" % level)
+
+def format_record(record):
+    level, name, msg, args = record
+    if args:
+        try:
+            msg = msg % args
+        except Exception:
+            msg = "%s %r" % (msg, args)
+    if name:
+        return "[%s] %s: %s" % (getLevelName(level), name, msg)
+    return "[%s] %s" % (getLevelName(level), msg)
+
+def console_sink(record):
+    """Write the record to the UART console."""
+    _console_print(format_record(record))
+
+class RingSink:
+    """Keep the last capacity records in RAM, unformatted."""
+
+    def __init__(self, capacity=32):
+        self.records = [None] * capacity
+        self.next = 0
+        self.count = 0
+
+    def __call__(self, record):
+        self.records[self.next] = record
+        self.next = (self.next + 1) % len(self.records)
+        if self.count < len(self.records):
+            self.count += 1
+
+    def lines(self):
+        """Formatted records, oldest first."""
+        capacity = len(self.records)
+        start = (self.next - self.count) % capacity
+        return [format_record(self.records[(start + i) % capacity]) for i in range(self.count)]
+
+class TextSink:
+    """Pass (level, text) to write, e.g. a websocket log shipper's push()."""
+
+    def __init__(self, write, level=NOTSET):
+        self.write = write
+        self.level = level
+
+    def __call__(self, record):
+        if record[0] >= self.level:
+            self.write(record[0], format_record(record))
+
+def add_sink(sink):
+    if sink not in _sinks:
+        _sinks.append(sink)
+
+def remove_sink(sink):
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+def _emit(record):
+    for sink in _sinks:
+        try:
+            sink(record)
+        except Exception:
+            pass
 
 class Logger:
-    def debug(self, msg, *args): print("[DEBUG]", msg % args if args else msg)
-    def info(self, msg, *args): print("[INFO]", msg % args if args else msg)
-    def warning(self, msg, *args): print("[WARN]", msg % args if args else msg)
-    def error(self, msg, *args): print("[ERROR]", msg % args if args else msg)
-    def critical(self, msg, *args): print("[CRIT]", msg % args if args else msg)
-    def exception(self, msg, *args): print("[EXC]", msg % args if args else msg)
+    def __init__(self, name=None):
+        self.name = name
+        self.level = NOTSET  # NOTSET follows the root level
+
+    def setLevel(self, level):
+        self.level = level
+
+    def getEffectiveLevel(self):
+        return self.level or _state[0]
+
+    def isEnabledFor(self, level):
+        return level >= (self.level or _state[0]) and level > _state[1]
+
+    def log(self, level, msg, *args):
+        if level >= (self.level or _state[0]) and level > _state[1]:
+            _emit((level, self.name, msg, args))
+
+    def debug(self, msg, *args):
+        if DEBUG >= (self.level or _state[0]) and DEBUG > _state[1]:
+            _emit((DEBUG, self.name, msg, args))
+
+    def info(self, msg, *args):
+        if INFO >= (self.level or _state[0]) and INFO > _state[1]:
+            _emit((INFO, self.name, msg, args))
+
+    def warning(self, msg, *args):
+        if WARNING >= (self.level or _state[0]) and WARNING > _state[1]:
+            _emit((WARNING, self.name, msg, args))
+
+    def error(self, msg, *args):
+        if ERROR >= (self.level or _state[0]) and ERROR > _state[1]:
+            _emit((ERROR, self.name, msg, args))
+
+    def critical(self, msg, *args):
+        if CRITICAL >= (self.level or _state[0]) and CRITICAL > _state[1]:
+            _emit((CRITICAL, self.name, msg, args))
+
+    def exception(self, msg, *args):
+        self.error(msg, *args)
+
+def getLogger(name=None):
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = Logger(name)
+        _loggers[name] = logger
+    return logger
+
+def basicConfig(level=None, sinks=None):
+    """Set the root level and optionally replace the sinks."""
+    if level is not None:
+        _state[0] = level
+    if sinks is not None:
+        _sinks[:] = sinks
+
+def disable(level=CRITICAL):
+    """Drop every record at or below level, whatever the logger levels say."""
+    _state[1] = level
+
+def debug(msg, *args):
+    getLogger().debug(msg, *args)
+
+def info(msg, *args):
+    getLogger().info(msg, *args)
+
+def warning(msg, *args):
+    getLogger().warning(msg, *args)
+
+def error(msg, *args):
+    getLogger().error(msg, *args)
+
+def critical(msg, *args):
+    getLogger().critical(msg, *args)
+
+add_sink(console_sink)
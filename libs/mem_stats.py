@@ -0,0 +1,113 @@
+# Heap and GC instrumentation for the MicroPython heads.
+#
+# The control loop calls after_tick() once per tick; when free heap drops below
+# the margin it runs gc.collect() there, between actuator updates, instead of
+# letting an allocation trigger one in the middle of a move. Each collection we
+# run is timed. Collections triggered by the allocator are inferred from the
+# allocated byte count dropping between samples.
+#
+# sample() only reads gc.mem_free()/gc.mem_alloc(), so reporting never adds a
+# pause of its own. MicroPython has no API for the largest free block; with
+# probe=True sample() also finds it with trial allocations while automatic
+# collection is disabled (so a failed attempt doesn't collect), collecting
+# before and after. That costs two full collections, so it is opt-in.
+import gc
+import time
+
+GC_MARGIN = 16 * 1024       # Collect between ticks once free heap drops below this
+PROBE_STEPS = 4             # Binary-search refinements after the power-of-two probe
+
+def _largest_free_block(limit):
+    """Size of the largest allocation that currently succeeds, to within limit >> PROBE_STEPS."""
+    size = 1
+    while size * 2 <= limit:
+        size *= 2
+    probe = None
+    gc.disable()
+    try:
+        while size >= 16:
+            try:
+                probe = bytearray(size)
+                break
+            except MemoryError:
+                size //= 2
+        if probe is None:
+            return 0
+        probe = None
+        low = size
+        step = size // 2
+        for _ in range(PROBE_STEPS):
+            try:
+                probe = bytearray(low + step)
+                probe = None
+                low += step
+            except MemoryError:
+                pass
+            step //= 2
+        return low
+    finally:
+        gc.enable()
+
+class MemStats:
+    def __init__(self, margin=GC_MARGIN):
+        self.margin = margin
+        self.collections = 0        # collections run by after_tick()/sample(probe=True)
+        self.auto_collections = 0   # collections the allocator ran on its own (inferred)
+        self.pause_us = 0           # last collection we timed
+        self.pause_max_us = 0
+        self.pause_total_us = 0
+        self._last_alloc = gc.mem_alloc()
+        self._sample_free = gc.mem_free()    # at the previous sample()
+        self._sample_alloc = self._last_alloc
+
+    def _collect(self):
+        start = time.ticks_us()
+        gc.collect()
+        pause = time.ticks_diff(time.ticks_us(), start)
+        self.collections += 1
+        self.pause_us = pause
+        self.pause_total_us += pause
+        if pause > self.pause_max_us:
+            self.pause_max_us = pause
+        self._last_alloc = gc.mem_alloc()
+
+    def _check_auto(self):
+        alloc = gc.mem_alloc()
+        if alloc < self._last_alloc:
+            self.auto_collections += 1
+        self._last_alloc = alloc
+
+    def after_tick(self):
+        """Collect now, between ticks, if the heap is getting low."""
+        self._check_auto()
+        if gc.mem_free() < self.margin:
+            self._collect()
+
+    def sample(self, probe=False):
+        """Measure the heap and return a stats dict; pause_max_us restarts per sample."""
+        self._check_auto()
+        largest = None
+        if probe:
+            self._collect()
+            largest = _largest_free_block(gc.mem_free())
+            # Release the probe allocations
+            gc.collect()
+            self._last_alloc = gc.mem_alloc()
+        free = gc.mem_free()
+        alloc = self._last_alloc
+        stats = {
+            "free": free,
+            "alloc": alloc,
+            "free_delta": free - self._sample_free,
+            "alloc_delta": alloc - self._sample_alloc,
+            "max_free_block": largest,
+            "gc_count": self.collections,
+            "gc_auto_count": self.auto_collections,
+            "gc_pause_us": self.pause_us,
+            "gc_pause_max_us": self.pause_max_us,
+            "gc_pause_total_us": self.pause_total_us,
+        }
+        self._sample_free = free
+        self._sample_alloc = alloc
+        self.pause_max_us = 0
+        return stats
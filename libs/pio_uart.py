@@ -0,0 +1,202 @@
+# PIO-based UART for pins the hardware UARTs can't reach, with the same
+# interface as RingUART (any/readinto/read/wait/write/flush/txdone).
+#
+# RX: the state machine raises its IRQ after pushing each byte; the hard IRQ
+# handler drains the RX FIFO into a preallocated RingBuffer and wakes waiters.
+# TX: write() queues into a second ring and returns at once. Where rp2.DMA is
+# available a DMA channel paced by the state machine's DREQ moves the queued
+# bytes into the TX FIFO, refilled from its completion interrupt; otherwise the
+# bytes are fed into the (joined, 8-deep) TX FIFO as space allows, whenever the
+# UART is used.
+
+from machine import Pin
+from rp2 import PIO, StateMachine, asm_pio
+import uasyncio as asyncio
+from ring_uart import RingBuffer
+
+try:
+    from rp2 import DMA
+except ImportError:
+    DMA = None
+
+_PIO_BASE = (0x50200000, 0x50300000)
+_PIO_TXF0 = 0x010           # TX FIFO register of state machine 0; +4 per state machine
+_DREQ_PIO_TX0 = (0, 8)      # DREQ of PIO0/PIO1 state machine 0 TX; +1 per state machine
+
+TX_STAGE_SIZE = 64          # Bytes handed to one DMA transfer
+
+@asm_pio(sideset_init=PIO.OUT_HIGH, out_init=PIO.OUT_HIGH, out_shiftdir=PIO.SHIFT_RIGHT,
+         fifo_join=PIO.JOIN_TX)
+def _uart_tx():
+    # Block with TX deasserted until data available
+    pull()
+    # Initialise bit counter, assert start bit for 8 cycles
+    set(x, 7)  .side(0)       [7]
+    # Shift out 8 data bits, 8 execution cycles per bit
+    label("bitloop")
+    out(pins, 1)              [6]
+    jmp(x_dec, "bitloop")
+    # Assert stop bit for 8 cycles total (incl 1 for pull())
+    nop()      .side(1)       [6]
+
+@asm_pio(in_shiftdir=PIO.SHIFT_RIGHT, fifo_join=PIO.JOIN_RX)
+def _uart_rx():
+    # fmt: off
+    # Wait for start bit
+    wait(0, pin, 0)
+    # Preload bit counter, delay until eye of first data bit
+    set(x, 7)                 [10]
+    # Loop 8 times
+    label("bitloop")
+    # Sample data
+    in_(pins, 1)
+    # Each iteration is 8 cycles
+    jmp(x_dec, "bitloop")     [6]
+    # Hand the byte over and tell the CPU; both fit in the stop bit
+    push(noblock)
+    irq(rel(0))
+    # fmt: on
+
+class PioUart:
+    """8N1 UART on two PIO state machines (ids sm_tx and sm_rx, 0-3 on PIO0, 4-7 on PIO1)."""
+
+    def __init__(self, tx_pin, rx_pin, baudrate=9600, sm_tx=0, sm_rx=1, rx_size=1024, tx_size=256, poll_ms=2):
+        self.rx = RingBuffer(rx_size)
+        self.tx = RingBuffer(tx_size)
+        self.poll_ms = poll_ms
+        self.tx_dropped = 0  # writes refused because the TX ring was full
+        self._flag = asyncio.ThreadSafeFlag()
+        self._sm_tx = StateMachine(
+            sm_tx, _uart_tx,
+            freq=baudrate * 8,
+            sideset_base=Pin(tx_pin),
+            out_base=Pin(tx_pin),
+        )
+        self._sm_rx = StateMachine(
+            sm_rx, _uart_rx,
+            freq=baudrate * 8,
+            in_base=Pin(rx_pin, Pin.IN, Pin.PULL_UP),
+        )
+        self._sm_rx.irq(handler=self._on_rx, hard=True)
+        self.irq_driven = True
+
+        self._dma = None
+        self._tx_stage = bytearray(TX_STAGE_SIZE)
+        self._tx_active = False
+        if DMA is not None:
+            block = sm_tx // 4
+            self._dma = DMA()
+            self._txf = _PIO_BASE[block] + _PIO_TXF0 + 4 * (sm_tx % 4)
+            self._ctrl = self._dma.pack_ctrl(size=0, inc_read=True, inc_write=False,
+                                             treq_sel=_DREQ_PIO_TX0[block] + sm_tx % 4,
+                                             irq_quiet=False)
+            self._dma.irq(handler=self._on_tx_done)
+
+        self._sm_tx.active(1)
+        self._sm_rx.active(1)
+
+    # === RX ===
+
+    def _on_rx(self, sm):
+        # Hard IRQ: no allocation. The byte sits in the top 8 bits of the RX
+        # word; get() shifts it down before making the int, because the 32-bit
+        # word itself would be a heap-allocated big int.
+        rx = self.rx
+        while sm.rx_fifo():
+            rx.put_byte(sm.get(None, 24))
+        self._flag.set()
+
+    def _pull(self):
+        if not self.irq_driven:
+            self._on_rx(self._sm_rx)
+            self._service_tx()
+
+    def disable_irq(self):
+        """Switch to polling, e.g. when another core owns this UART (interrupt handlers run on core 0)."""
+        if self.irq_driven:
+            self._sm_rx.irq(handler=None)
+            if self._dma is not None:
+                self._dma.irq(handler=None)
+            self.irq_driven = False
+
+    def any(self):
+        self._pull()
+        return self.rx.count()
+
+    def readinto(self, buf, nbytes=None):
+        """Copy received bytes into buf without allocating; return the count (0 if none)."""
+        self._pull()
+        if nbytes is None or nbytes > len(buf):
+            nbytes = len(buf)
+        return self.rx.get_into(buf, nbytes)
+
+    def read(self, nbytes=None):
+        """Allocating read for callers that want a bytes object; None when nothing is buffered."""
+        count = self.any()
+        if not count:
+            return None
+        if nbytes is not None and nbytes < count:
+            count = nbytes
+        buf = bytearray(count)
+        self.rx.get_into(buf, count)
+        return bytes(buf)
+
+    async def wait(self):
+        """Sleep until received bytes are buffered."""
+        while not self.any():
+            if self.irq_driven:
+                await self._flag.wait()
+            else:
+                await asyncio.sleep_ms(self.poll_ms)
+
+    # === TX ===
+
+    def _start_dma(self):
+        count = self.tx.get_into(self._tx_stage, TX_STAGE_SIZE)
+        if not count:
+            self._tx_active = False
+            return
+        self._tx_active = True
+        self._dma.config(read=self._tx_stage, write=self._txf, count=count, ctrl=self._ctrl, trigger=True)
+
+    def _on_tx_done(self, dma):
+        # Soft IRQ: runs to completion between bytecodes, so write() never sees a half-started transfer
+        self._start_dma()
+
+    def _service_tx(self):
+        if self._dma is not None:
+            if self.irq_driven:
+                if not self._tx_active:
+                    self._start_dma()
+            elif not self._dma.active():
+                self._start_dma()
+        else:
+            sm = self._sm_tx
+            tx = self.tx
+            stage = self._tx_stage
+            while tx.count() and sm.tx_fifo() < 8:
+                tx.get_into(stage, 1)
+                sm.put(stage[0])
+
+    def write(self, data):
+        """Queue data for transmission and return without waiting; a message that doesn't fit is dropped."""
+        count = len(data)
+        if count > self.tx.free():
+            self.tx_dropped += 1
+            return 0
+        self.tx.put(data, count)
+        self._service_tx()
+        return count
+
+    def flush(self):
+        """Block until everything queued has been handed to the state machine."""
+        while not self.txdone():
+            self._service_tx()
+
+    def txdone(self):
+        self._service_tx()
+        if self.tx.count():
+            return False
+        if self._dma is not None and self._dma.active():
+            return False
+        return self._sm_tx.tx_fifo() == 0
@@ -0,0 +1,127 @@
+# Server side of RFC 2217 (Telnet COM port control) for the controller's TCP
+# serial endpoints (CPython only).
+#
+# The endpoint carries no real UART, so line settings are accepted as sent:
+# every COM-PORT-OPTION request is answered with the same value (server codes
+# are client codes + 100), which is what clients such as pyserial's rfc2217://
+# wait for. Telnet option negotiation agrees to BINARY, SUPPRESS-GO-AHEAD and
+# COM-PORT-OPTION and refuses the rest. 0xFF data bytes are doubled on the wire.
+
+IAC = 0xFF
+DONT = 0xFE
+DO = 0xFD
+WONT = 0xFC
+WILL = 0xFB
+SB = 0xFA
+SE = 0xF0
+
+BINARY = 0x00
+SGA = 0x03
+COM_PORT_OPTION = 0x2C
+
+SERVER_OFFSET = 100
+SUBNEG_MAX = 64     # Longest subnegotiation kept; longer ones are cut short
+
+_DATA = 0
+_IAC = 1
+_OPTION = 2
+_SB = 3
+_SB_IAC = 4
+
+class Rfc2217Codec:
+    """Split a client's byte stream into serial data and Telnet replies."""
+
+    def __init__(self):
+        self.state = _DATA
+        self.command = 0
+        self.subneg = bytearray()
+        self.will = set()   # options we have agreed to perform
+        self.do = set()     # options we have asked the client to perform
+
+    def greeting(self):
+        """Offers sent when a client is first seen speaking Telnet."""
+        self.will.update((BINARY, SGA, COM_PORT_OPTION))
+        self.do.update((BINARY, SGA))
+        return bytes((IAC, WILL, BINARY, IAC, DO, BINARY,
+                      IAC, WILL, SGA, IAC, DO, SGA,
+                      IAC, WILL, COM_PORT_OPTION))
+
+    def decode(self, data):
+        """Return (serial data, bytes to send back to the client) for one received chunk."""
+        out = bytearray()
+        replies = bytearray()
+        for byte in data:
+            state = self.state
+            if state == _DATA:
+                if byte == IAC:
+                    self.state = _IAC
+                else:
+                    out.append(byte)
+            elif state == _IAC:
+                if byte == IAC:
+                    out.append(IAC)
+                    self.state = _DATA
+                elif byte in (WILL, WONT, DO, DONT):
+                    self.command = byte
+                    self.state = _OPTION
+                elif byte == SB:
+                    self.subneg.clear()
+                    self.state = _SB
+                else:
+                    self.state = _DATA  # NOP, AYT and friends carry nothing for us
+            elif state == _OPTION:
+                replies += self._negotiate(self.command, byte)
+                self.state = _DATA
+            elif state == _SB:
+                if byte == IAC:
+                    self.state = _SB_IAC
+                elif len(self.subneg) < SUBNEG_MAX:
+                    self.subneg.append(byte)
+            else:
+                if byte == SE:
+                    replies += self._subnegotiation(self.subneg)
+                    self.state = _DATA
+                else:
+                    # IAC IAC inside a subnegotiation is a literal 0xFF
+                    if len(self.subneg) < SUBNEG_MAX:
+                        self.subneg.append(byte)
+                    self.state = _SB
+        return bytes(out), bytes(replies)
+
+    def encode(self, data):
+        """Escape serial data for the client."""
+        return data.replace(b"\xff", b"\xff\xff")
+
+    def _negotiate(self, command, option):
+        # Only answer changes of state, so the two ends can't loop
+        if command == DO:
+            if option in (BINARY, SGA, COM_PORT_OPTION):
+                if option not in self.will:
+                    self.will.add(option)
+                    return bytes((IAC, WILL, option))
+                return b""
+            return bytes((IAC, WONT, option))
+        if command == DONT:
+            if option in self.will:
+                self.will.discard(option)
+                return bytes((IAC, WONT, option))
+            return b""
+        if command == WILL:
+            if option in (BINARY, SGA, COM_PORT_OPTION):
+                if option not in self.do:
+                    self.do.add(option)
+                    return bytes((IAC, DO, option))
+                return b""
+            return bytes((IAC, DONT, option))
+        if option in self.do:
+            self.do.discard(option)
+            return bytes((IAC, DONT, option))
+        return b""
+
+    def _subnegotiation(self, subneg):
+        if len(subneg) < 2 or subneg[0] != COM_PORT_OPTION or subneg[1] >= SERVER_OFFSET:
+            return b""
+        reply = bytearray((IAC, SB, COM_PORT_OPTION, subneg[1] + SERVER_OFFSET))
+        reply += self.encode(bytes(subneg[2:]))
+        reply += bytes((IAC, SE))
+        return bytes(reply)
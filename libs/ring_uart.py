@@ -0,0 +1,157 @@
+# Interrupt-driven UART with a preallocated receive ring buffer for MicroPython heads.
+#
+# The UART's RX-idle interrupt drains the hardware buffer into the ring and wakes
+# any task waiting in wait(). Consumers copy bytes out with readinto(), which
+# doesn't allocate. On firmware without UART.irq() the same API is served by
+# polling at poll_ms.
+#
+# DMA is not used for RX: a DMA ring on the RP2040 needs a buffer aligned to its
+# size, which MicroPython's heap can't guarantee.
+
+from machine import UART
+import uasyncio as asyncio
+from byte_copy import copy as _copy
+
+class RingBuffer:
+    """Fixed-size byte ring; size must be a power of two."""
+
+    def __init__(self, size):
+        self.buf = bytearray(size)
+        self.mask = size - 1
+        self.head = 0  # next write position (free-running)
+        self.tail = 0  # next read position (free-running)
+        self.overruns = 0
+
+    def count(self):
+        return (self.head - self.tail) & 0x3FFFFFFF
+
+    def free(self):
+        return len(self.buf) - self.count()
+
+    def clear(self):
+        self.tail = self.head
+
+    def put(self, src, count):
+        """Append up to count bytes from src; return how many fit.
+
+        Only the consumer moves tail, so when the ring is full the new bytes
+        are dropped (and counted in overruns) rather than the oldest ones.
+        """
+        room = self.free()
+        if count > room:
+            self.overruns += count - room
+            count = room
+        size = len(self.buf)
+        pos = self.head & self.mask
+        first = size - pos
+        if first > count:
+            first = count
+        _copy(self.buf, pos, src, 0, first)
+        if count > first:
+            _copy(self.buf, 0, src, first, count - first)
+        self.head = (self.head + count) & 0x3FFFFFFF
+        return count
+
+    def put_byte(self, value):
+        """Append one byte, dropping it if the ring is full; safe in a hard IRQ (doesn't allocate)."""
+        if self.count() == len(self.buf):
+            self.overruns += 1
+            return
+        self.buf[self.head & self.mask] = value
+        self.head = (self.head + 1) & 0x3FFFFFFF
+
+    def get_into(self, dst, count):
+        """Move up to count bytes into dst[0:]; return how many were moved."""
+        available = self.count()
+        if count > available:
+            count = available
+        size = len(self.buf)
+        pos = self.tail & self.mask
+        first = size - pos
+        if first > count:
+            first = count
+        _copy(dst, 0, self.buf, pos, first)
+        if count > first:
+            _copy(dst, first, self.buf, 0, count - first)
+        self.tail = (self.tail + count) & 0x3FFFFFFF
+        return count
+
+class RingUART:
+    """machine.UART wrapper that receives into a RingBuffer and wakes tasks on arrival."""
+
+    def __init__(self, uart_id, baudrate, rx_size=1024, poll_ms=2, **kwargs):
+        self.uart = UART(uart_id, baudrate, timeout=0, rxbuf=rx_size, **kwargs)
+        self.rx = RingBuffer(rx_size)
+        self.poll_ms = poll_ms
+        self._stage = bytearray(64)
+        self._flag = asyncio.ThreadSafeFlag()
+        self.irq_driven = False
+        try:
+            self.uart.irq(handler=self._on_irq, trigger=UART.IRQ_RXIDLE)
+            self.irq_driven = True
+        except (AttributeError, TypeError, ValueError):
+            pass
+
+    def disable_irq(self):
+        """Switch to polling, e.g. when another core owns this UART (interrupt handlers run on core 0)."""
+        if self.irq_driven:
+            self.uart.irq(handler=None)
+            self.irq_driven = False
+
+    def _pull(self):
+        """Move whatever the hardware buffer holds into the ring; return bytes moved."""
+        # Only one context fills the ring: the IRQ when we have one, otherwise the reader
+        total = 0
+        stage = self._stage
+        while self.uart.any():
+            count = self.uart.readinto(stage)
+            if not count:
+                break
+            self.rx.put(stage, count)
+            total += count
+        return total
+
+    def _on_irq(self, uart):
+        if self._pull():
+            self._flag.set()
+
+    def any(self):
+        if not self.irq_driven:
+            self._pull()
+        return self.rx.count()
+
+    def readinto(self, buf, nbytes=None):
+        """Copy received bytes into buf without allocating; return the count (0 if none)."""
+        if not self.irq_driven:
+            self._pull()
+        if nbytes is None or nbytes > len(buf):
+            nbytes = len(buf)
+        return self.rx.get_into(buf, nbytes)
+
+    def read(self, nbytes=None):
+        """Allocating read for callers that want a bytes object; None when nothing is buffered."""
+        count = self.any()
+        if not count:
+            return None
+        if nbytes is not None and nbytes < count:
+            count = nbytes
+        buf = bytearray(count)
+        self.rx.get_into(buf, count)
+        return bytes(buf)
+
+    async def wait(self):
+        """Sleep until received bytes are buffered."""
+        while not self.any():
+            if self.irq_driven:
+                await self._flag.wait()
+            else:
+                await asyncio.sleep_ms(self.poll_ms)
+
+    def write(self, data):
+        return self.uart.write(data)
+
+    def flush(self):
+        self.uart.flush()
+
+    def txdone(self):
+        return self.uart.txdone()
@@ -0,0 +1,73 @@
+# Half-duplex RS-485 transmit path that never blocks the caller.
+#
+# write() queues a frame and returns. poll() (or the run() task, which calls
+# it) asserts DE, hands queued bytes to the UART, and releases DE only once the
+# UART reports the last bit has left (uart.txdone()). Frames queued while a
+# burst is still going out join that burst, so back-to-back frames share one
+# turnaround.
+import uasyncio as asyncio
+from ring_uart import RingBuffer
+
+STAGE_SIZE = 64
+
+class Rs485:
+    """Queue frames for a UART behind an RS-485 driver whose DE pin is de (None if there isn't one)."""
+
+    def __init__(self, uart, de=None, tx_level=1, rx_level=0, size=512):
+        self.uart = uart
+        self.de = de
+        self.tx_level = tx_level
+        self.rx_level = rx_level
+        self.queue = RingBuffer(size)
+        self.sending = False
+        self.dropped = 0    # frames refused because the queue was full
+        self.bursts = 0     # DE assertions
+        self._stage = bytearray(STAGE_SIZE)
+        # Views of _stage by length, created on first use so sending doesn't allocate
+        self._views = [None] * (STAGE_SIZE + 1)
+        self._flag = asyncio.ThreadSafeFlag()
+        if de is not None:
+            de.value(rx_level)
+
+    def write(self, data):
+        """Queue a whole frame; returns its length, or 0 if it didn't fit."""
+        count = len(data)
+        if count > self.queue.free():
+            self.dropped += 1
+            return 0
+        self.queue.put(data, count)
+        self._flag.set()
+        return count
+
+    def busy(self):
+        return self.sending or self.queue.count() != 0
+
+    def poll(self):
+        """Advance the transmitter: start or extend a burst, or end it once the UART is idle."""
+        queue = self.queue
+        if queue.count():
+            if not self.sending:
+                self.sending = True
+                self.bursts += 1
+                if self.de is not None:
+                    self.de.value(self.tx_level)
+            while queue.count():
+                count = queue.get_into(self._stage, STAGE_SIZE)
+                view = self._views[count]
+                if view is None:
+                    view = memoryview(self._stage)[:count]
+                    self._views[count] = view
+                self.uart.write(view)
+        elif self.sending and self.uart.txdone():
+            if self.de is not None:
+                self.de.value(self.rx_level)
+            self.sending = False
+
+    async def run(self):
+        """Drive poll() from the event loop: sleep while idle, yield while a burst drains."""
+        while True:
+            self.poll()
+            if self.sending:
+                await asyncio.sleep_ms(0)
+            else:
+                await self._flag.wait()
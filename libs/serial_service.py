@@ -0,0 +1,103 @@
+# Threaded pyserial port for asyncio programs (CPython only).
+#
+# A reader thread sits in a blocking ser.read(): with timeout=None it sleeps
+# until the first byte arrives, and inter_byte_timeout ends the read once the
+# line goes quiet, so one read returns one burst. A writer thread drains a
+# queue of outgoing data. Received bursts reach the event loop through
+# loop.call_soon_threadsafe, so nothing polls and no executor jobs are used.
+import asyncio
+import queue
+import threading
+import time
+
+READ_CHUNK = 256        # Max bytes returned by one read
+IDLE_S = 0.005          # Inter-byte gap that ends a read
+ERROR_PAUSE_S = 0.1     # Pause after a read/write error before trying again
+
+class SerialService:
+    """
+    Serve an open serial.Serial from two threads. Bursts are delivered as
+    (data, idle) pairs from get(): idle is True when the line went quiet after
+    the burst, False when the read stopped because READ_CHUNK bytes arrived.
+    """
+
+    def __init__(self, ser, loop=None, read_chunk=READ_CHUNK, idle_s=IDLE_S):
+        self.ser = ser
+        self.loop = loop or asyncio.get_running_loop()
+        self.read_chunk = read_chunk
+        ser.timeout = None
+        ser.inter_byte_timeout = idle_s
+        self._rx = asyncio.Queue()
+        self._tx = queue.Queue()
+        self._closed = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._reader, name=f"{ser.port} rx", daemon=True),
+            threading.Thread(target=self._writer, name=f"{ser.port} tx", daemon=True),
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def _reader(self):
+        ser = self.ser
+        while not self._closed.is_set():
+            try:
+                data = ser.read(self.read_chunk)
+            except Exception as e:
+                if self._closed.is_set():
+                    break
+                print(f"Error reading from {ser.port}: {e}")
+                self.loop.call_soon_threadsafe(self._rx.put_nowait, (None, False))
+                time.sleep(ERROR_PAUSE_S)
+                continue
+            if data:
+                self.loop.call_soon_threadsafe(self._rx.put_nowait, (data, len(data) < self.read_chunk))
+
+    def _writer(self):
+        ser = self.ser
+        while True:
+            data = self._tx.get()
+            if data is None:
+                break
+            # Coalesce whatever else is already queued into one write
+            chunks = [data]
+            while True:
+                try:
+                    more = self._tx.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    self._tx.put(None)
+                    break
+                chunks.append(more)
+            try:
+                ser.write(b"".join(chunks))
+                ser.flush()
+            except Exception as e:
+                print(f"Error writing to {ser.port}: {e}")
+                time.sleep(ERROR_PAUSE_S)
+
+    async def get(self):
+        """Wait for the next received burst; data is None after a read error."""
+        return await self._rx.get()
+
+    def write(self, data):
+        """Queue data for the writer thread; never blocks."""
+        if data and not self._closed.is_set():
+            self._tx.put(bytes(data))
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._tx.put(None)
+        try:
+            self.ser.cancel_read()
+        except Exception:
+            pass
+        try:
+            self.ser.close()
+        except Exception:
+            pass
@@ -0,0 +1,60 @@
+# Lock-free single-producer/single-consumer record queue for passing data
+# between the two RP2040 cores.
+#
+# Each record is a kind byte plus up to slot_size payload bytes, stored in a
+# fixed slot and copied by index, so nothing is allocated per message. Only the
+# producer writes the head index and only the consumer writes the tail index; a
+# slot's contents are written before head is advanced past it, so the consumer
+# never sees a partial record. Indices are kept below 2**30 so they stay small ints on MicroPython.
+
+from array import array
+from byte_copy import copy
+
+_INDEX_MASK = 0x3FFFFFFF
+_SLOT_HEADER = 3  # length (2 bytes, little endian) + kind
+
+class SpscRing:
+    """Fixed-slot record queue; slots must be a power of two."""
+
+    def __init__(self, slots, slot_size):
+        self.slots = slots
+        self.slot_size = slot_size
+        self.mask = slots - 1
+        self.stride = slot_size + _SLOT_HEADER
+        self.buf = bytearray(slots * self.stride)
+        self.index = array("I", [0, 0])  # [head (producer), tail (consumer)]
+        self.dropped = 0  # records refused because the ring was full (producer side)
+
+    def count(self):
+        return (self.index[0] - self.index[1]) & _INDEX_MASK
+
+    def put(self, kind, data=None, count=0, start=0):
+        """Append a record from data[start:start + count]; return False (and count a drop) if full or too big."""
+        head = self.index[0]
+        if count > self.slot_size or ((head - self.index[1]) & _INDEX_MASK) >= self.slots:
+            self.dropped += 1
+            return False
+        offset = (head & self.mask) * self.stride
+        buf = self.buf
+        buf[offset] = count & 0xFF
+        buf[offset + 1] = count >> 8
+        buf[offset + 2] = kind
+        if count:
+            copy(buf, offset + _SLOT_HEADER, data, start, count)
+        # Publish only after the slot is complete
+        self.index[0] = (head + 1) & _INDEX_MASK
+        return True
+
+    def get_into(self, dst):
+        """Copy the oldest record to dst as kind followed by payload; return its length, or 0 if empty."""
+        tail = self.index[1]
+        if tail == self.index[0]:
+            return 0
+        offset = (tail & self.mask) * self.stride
+        buf = self.buf
+        count = buf[offset] | (buf[offset + 1] << 8)
+        dst[0] = buf[offset + 2]
+        if count:
+            copy(dst, 1, buf, offset + _SLOT_HEADER, count)
+        self.index[1] = (tail + 1) & _INDEX_MASK
+        return count + 1
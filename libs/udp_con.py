@@ -14,6 +14,9 @@ except ImportError:
     MICROPYTHON = False
 
 from stun_query import query_stun_server
+import logging
+
+LOGGER = logging.getLogger(__name__)
     
 # Packet format (binary):
 # [DATA_MAGIC:4 bytes][flags:1 byte][channel_id:2 bytes][seq_num:4 bytes][data:variable]
@@ -22,6 +25,8 @@ DATA_MAGIC = b'UDPD'  # Magic header to identify valid packets
 STUN_CHECK_MAGIC = b"STUN_CHECK"
 STUN_RESPONSE_MAGIC = b"STUN_RESPONSE"
 FLAG_ACK = 0x01
+CHECK_INTERVAL = 0.5       # Seconds between connectivity check rounds
+IDLE_CHECK_INTERVAL = 2.0  # Same, for idle standby connections; 10 missed rounds still drop a candidate
 
 class UDPConnection:
     """
@@ -62,7 +67,16 @@ class UDPConnection:
         self.onClose = onClose  # Callback called when connection closes
         self.on_reliable_message = on_reliable_message
         self.on_unreliable_message = on_unreliable_message
+        self.idle = False  # Hot standby: keep only the pair in use alive, less often (see set_idle)
     
+    def set_idle(self, idle):
+        """
+        Mark the connection as an idle standby. Idle connections send
+        connectivity checks and keepalives only on the pair in use, every
+        IDLE_CHECK_INTERVAL instead of CHECK_INTERVAL, so holding many is cheap.
+        """
+        self.idle = idle
+
     @classmethod
     async def create(
         cls,
@@ -94,7 +108,7 @@ class UDPConnection:
             on_unreliable_message=on_unreliable_message,
         )
         await connection.start()
-        print(f"Created UDP connection with channels for {peer_uid}")
+        LOGGER.info("Created UDP connection with channels for %s", peer_uid)
         return connection
 
     @classmethod
@@ -161,10 +175,9 @@ class UDPConnection:
         if packet[:len(DATA_MAGIC)] != DATA_MAGIC:
             return None
         
-        # Strip magic header and decode
-        payload = packet[len(DATA_MAGIC):]
-        flags, channel_id, seq_num = struct.unpack('!BHI', payload[:7])
-        data = payload[7:]
+        # Decode in place; only the payload is copied out
+        flags, channel_id, seq_num = struct.unpack_from('!BHI', packet, len(DATA_MAGIC))
+        data = packet[len(DATA_MAGIC) + 7:]
         return flags, channel_id, seq_num, data
     
     def _send_raw(self, packet, addr=None):
@@ -277,7 +290,7 @@ class UDPConnection:
                 await self._open(addr)
         else:
             # Response from unexpected address - discover prflx candidate
-            print(f"Received STUN response from unexpected address {addr}, creating prflx candidate")
+            LOGGER.debug("Received STUN response from unexpected address %s, creating prflx candidate", addr)
             prflx_candidate = {
                 "type": "prflx",
                 "address": addr[0],
@@ -290,7 +303,7 @@ class UDPConnection:
                 if (known_cand["address"] == prflx_candidate["address"] and
                     known_cand["port"] == prflx_candidate["port"]):
                     already_known = True
-                    print(f"Already known prflx candidate: {known_cand}")
+                    LOGGER.debug("Already known prflx candidate: %s", known_cand)
                     break
             
             if not already_known:
@@ -300,7 +313,7 @@ class UDPConnection:
                 # Reset no-response count for this candidate
                 if addr in self.candidate_no_response_count:
                     del self.candidate_no_response_count[addr]
-                print(f"Added new prflx candidate: {prflx_candidate}")
+                LOGGER.info("Added new prflx candidate: %s", prflx_candidate)
                 # Will form new pairs in next round
         
         # If it's a check from peer, respond (and mark this address for continued responses)
@@ -317,12 +330,11 @@ class UDPConnection:
         """Continuously perform candidate pair evaluation using ICE-like connectivity checks"""
         # Socket should already be non-blocking (set by receiver loop)
         round_num = 0
-        round_interval = 0.5  # Send checks every 500ms
         previous_checks_sent = {}  # Track checks sent in previous round
         
         while self.running:
             round_num += 1
-            print(f"Candidate pair evaluation round {round_num}")
+            LOGGER.debug("Candidate pair evaluation round %d", round_num)
             
             # Update no-response counts for candidates checked in previous round
             # (skip this on first round when previous_checks_sent is empty)
@@ -333,11 +345,11 @@ class UDPConnection:
                         # This candidate was checked but didn't respond
                         self.candidate_no_response_count[remote_addr] = self.candidate_no_response_count.get(remote_addr, 0) + 1
                         count = self.candidate_no_response_count[remote_addr]
-                        print(f"Candidate {remote_addr} has {count} rounds without response")
+                        LOGGER.debug("Candidate %s has %d rounds without response", remote_addr, count)
                         
                         # Remove candidate if it has exceeded 10 rounds without response
                         if count >= 10:
-                            print(f"Removing candidate {remote_addr} after {count} rounds without response")
+                            LOGGER.info("Removing candidate %s after %d rounds without response", remote_addr, count)
                             # Remove from all_remote_candidates
                             self.all_remote_candidates = [
                                 cand for cand in self.all_remote_candidates
@@ -355,9 +367,17 @@ class UDPConnection:
             for local_cand in self.local_candidates:
                 for remote_cand in self.all_remote_candidates:
                     all_pairs.append((local_cand, remote_cand))
+
+            # An idle connection only keeps the pair in use alive
+            idle = self.idle and self.peer_addr is not None
+            if idle:
+                in_use = [pair for pair in all_pairs
+                          if (pair[1]["address"], pair[1]["port"]) == self.peer_addr]
+                if in_use:
+                    all_pairs = in_use
             
             if not all_pairs:
-                print("No candidate pairs to evaluate - stopping connection")
+                LOGGER.info("No candidate pairs to evaluate - stopping connection")
                 self.running = False
                 return
             
@@ -380,6 +400,8 @@ class UDPConnection:
             # Continue sending keepalive responses to known addresses
             current_time = time_module.time()
             for resp_addr in list(self.response_addresses):
+                if idle and resp_addr != self.peer_addr:
+                    continue
                 last_send = self.last_response_send_time.get(resp_addr, 0)
                 if current_time - last_send >= 0.1:  # Send every 100ms
                     try:
@@ -393,7 +415,7 @@ class UDPConnection:
             previous_checks_sent = self.checks_sent.copy()
             
             # Wait before next round
-            await asyncio.sleep(round_interval)
+            await asyncio.sleep(IDLE_CHECK_INTERVAL if idle else CHECK_INTERVAL)
     
     async def _supervisor_loop(self):
         """Supervisor task that manages subordinate tasks and performs cleanup"""
@@ -411,10 +433,10 @@ class UDPConnection:
             
             # Set up message handlers (from caller if provided, else defaults)
             async def _default_on_reliable_message(data):
-                print(f"Reliable channel received: {data}")
+                LOGGER.debug("Reliable channel received: %s", data)
 
             async def _default_on_unreliable_message(data):
-                print(f"Unreliable channel received: {data}")
+                LOGGER.debug("Unreliable channel received: %s", data)
 
             reliable_channel.on_message = self.on_reliable_message or _default_on_reliable_message
             unreliable_channel.on_message = self.on_unreliable_message or _default_on_unreliable_message
@@ -730,7 +752,7 @@ class ReliableDataChannel(DataChannel):
                                 to_retransmit.append((seq_num, data, retransmit_count, index))
                             else:
                                 # Max retransmits reached - give up
-                                print(f"Max retransmits reached for seq {seq_num}, dropping")
+                                LOGGER.warning("Max retransmits reached for seq %d, dropping", seq_num)
                                 self.pending_packets[index] = None
                 
                 # Retransmit packets
@@ -0,0 +1,192 @@
+# Check that the head control path doesn't allocate per packet.
+#
+# Run on the MicroPython unix port from the repository root:
+#   micropython test/alloc_check.py
+#
+# Feeds full and delta control packets through ControlMailbox.post_packet() and
+# ControlLoop.tick() (BGC joystick frames and VISCA zoom/focus/iris commands
+# sent through the RS-485 queue, with camera ACK/completion replies parsed
+# back), with the GC disabled, and compares gc.mem_alloc() before and after.
+# Then does the same for core 1's I/O work: BGC realtime replies and camera
+# inquiry replies parsed into telemetry, UART bytes framed into io_to_net
+# records, and records from net_to_io written out to the UARTs.
+import sys
+import gc
+import time
+
+sys.path.insert(0, "libs")
+sys.path.insert(0, "apps/head")
+
+class _UART:
+    """Stand-in for machine.UART that accepts writes without keeping them."""
+    IRQ_RXIDLE = 1
+
+    def __init__(self, *args, **kwargs):
+        self.written = 0
+
+    def irq(self, handler=None, trigger=None):
+        pass
+
+    def write(self, data):
+        self.written += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def txdone(self):
+        return True
+
+    def any(self):
+        return 0
+
+    def readinto(self, buf):
+        return 0
+
+class _Pin:
+    OUT = 1
+    IN = 0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def value(self, *args):
+        pass
+
+    def toggle(self):
+        pass
+
+class _Machine:
+    UART = _UART
+    Pin = _Pin
+
+    @staticmethod
+    def unique_id():
+        return b"\x00\x01\x02\x03\x04\x05\x06\x07"
+
+sys.modules["machine"] = _Machine
+
+import main
+import bgc
+import visca
+from bgc_parser import build_frame
+from spsc_ring import SpscRing
+
+ROUNDS = 500
+REPLIES = bytes([0x90, 0x41, 0xFF, 0x90, 0x51, 0xFF, 0x90, 0x42, 0xFF, 0x90, 0x52, 0xFF])
+ZOOM_REPLY = bytes([0x90, 0x50, 0x01, 0x02, 0x03, 0x04, 0xFF])
+
+def make_bgc_reply(command_id, size):
+    buf = bytearray(size + 6)
+    for i in range(size):
+        buf[4 + i] = (i * 37) & 0xFF
+    build_frame(buf, command_id, size)
+    return bytes(buf)
+
+# One burst as read from the BGC UART: a realtime angles reply, a full state reply
+BGC_REPLIES = make_bgc_reply(bgc.CMD_REALTIME_DATA_CUSTOM, 14) + make_bgc_reply(bgc.CMD_REALTIME_DATA_3, 63)
+
+def make_packet(i):
+    zoom = (i % 64) - 32
+    return bytes([0xDE, 0xFD, zoom & 0xFF, (zoom >> 8) & 0xFF,
+                  0, i % 64, 0, (i * 3) % 64,
+                  0x80, i & 0xFF, 0x80, (i * 7) & 0xFF, 0x80, 0x00,
+                  0, 0])
+
+def make_delta(i):
+    # yaw and roll changed
+    return bytes([0xDE, 0xFC, 0x28, 0x80, i & 0xFF, 0x80, (i * 5) & 0xFF])
+
+def run(packets, box, control, camera, rounds):
+    for i in range(rounds):
+        box.post_packet(packets[i % len(packets)])
+        control.tick(box, time.ticks_ms())
+        camera.link.poll()
+        camera.parse(REPLIES, len(REPLIES))
+
+def main_check():
+    packets = []
+    for i in range(32):
+        packets.append(make_packet(i))
+        packets.append(make_delta(i))
+    box = main.ControlMailbox()
+    control = main.ControlLoop()
+    camera = main.camera
+    camera.focus_control = True
+    camera.iris_control = True
+
+    # Warm up: first sends create the cached frame views
+    run(packets, box, control, camera, 64)
+
+    gc.collect()
+    gc.disable()
+    try:
+        before = gc.mem_alloc()
+        run(packets, box, control, camera, ROUNDS)
+        after = gc.mem_alloc()
+    finally:
+        gc.enable()
+
+    allocated = after - before
+    print("control path: %d packets, %d bytes allocated" % (ROUNDS, allocated))
+    assert box.rejected == 0, "packets rejected"
+    assert allocated == 0, "control path allocated %d bytes" % allocated
+    print("OK")
+
+def run_io(box, camera, rec, rec_views, bgc_framer, camera_framer, rounds):
+    for i in range(rounds):
+        main.bgc.parse(BGC_REPLIES, len(BGC_REPLIES))
+        main._io_feed(main.REC_BGC, bgc_framer, BGC_REPLIES, len(BGC_REPLIES))
+        camera._inquiry = visca.INQUIRY_ZOOM
+        camera.parse(ZOOM_REPLY, len(ZOOM_REPLY))
+        main._io_feed(main.REC_CAMERA, camera_framer, ZOOM_REPLY, len(ZOOM_REPLY))
+        packet = main.bgc.encode_telemetry()
+        main.io_to_net.put(main.REC_TELEMETRY, packet, len(packet))
+        packet = camera.encode_telemetry()
+        main.io_to_net.put(main.REC_TELEMETRY, packet, len(packet))
+        # Core 0 drains io_to_net; the COM bytes go back out through net_to_io
+        while True:
+            n = main.io_to_net.get_into(rec)
+            if not n:
+                break
+            if rec[0] != main.REC_TELEMETRY:
+                main.net_to_io.put(rec[0], rec, n - 1, 1)
+        while True:
+            n = main.net_to_io.get_into(rec)
+            if not n:
+                break
+            main._io_dispatch(box, rec, rec_views, n)
+
+def io_check():
+    main.net_to_io = SpscRing(main.IO_SLOTS, main.IO_SLOT_SIZE)
+    main.io_to_net = SpscRing(main.IO_SLOTS, main.IO_SLOT_SIZE)
+    box = main.ControlMailbox()
+    camera = main.camera
+    rec = bytearray(main.IO_SLOT_SIZE + 1)
+    rec_views = [None] * (main.IO_SLOT_SIZE + 2)
+    bgc_framer = main.Framer(main.PROTOCOL_BGC)
+    camera_framer = main.Framer(main.PROTOCOL_VISCA)
+
+    # Warm up: first writes create the cached record views
+    run_io(box, camera, rec, rec_views, bgc_framer, camera_framer, 8)
+    frames = main.bgc.parser.frames
+
+    gc.collect()
+    gc.disable()
+    try:
+        before = gc.mem_alloc()
+        run_io(box, camera, rec, rec_views, bgc_framer, camera_framer, ROUNDS)
+        after = gc.mem_alloc()
+    finally:
+        gc.enable()
+
+    allocated = after - before
+    print("core 1 I/O: %d rounds, %d bytes allocated" % (ROUNDS, allocated))
+    assert main.bgc.parser.frames - frames == 2 * ROUNDS, "BGC replies not parsed"
+    assert main.bgc.state.state_valid and camera.lens.zoom == 0x1234, "replies not decoded"
+    assert main.io_to_net.dropped == 0 and main.net_to_io.dropped == 0, "records dropped"
+    assert allocated == 0, "core 1 I/O allocated %d bytes" % allocated
+    print("OK")
+
+main_check()
+io_check()
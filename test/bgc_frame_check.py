@@ -0,0 +1,156 @@
+# Check that a control packet reaches the BGC as the same bytes as before the
+# control path was reworked.
+#
+# Run on the MicroPython unix port from the repository root:
+#   micropython test/bgc_frame_check.py [apps/head_zoom]
+#
+# Encodes 0xFD packets the way the controller does, passes them through
+# ControlMailbox.post_packet() and ControlLoop.tick(), and compares each
+# CMD_API_VIRT_CH_CONTROL frame written to the BGC with the frame the original
+# head code built: decode_udp_packet() unpacking "<h5H2s", then
+# send_joystick_control() packing ">3H" behind a bitwise CRC16.
+import sys
+import struct
+
+APP = sys.argv[1] if len(sys.argv) > 1 else "apps/head"
+sys.path.insert(0, "libs")
+sys.path.insert(0, APP)
+
+class _UART:
+    """Stand-in for machine.UART that accepts writes without keeping them."""
+    IRQ_RXIDLE = 1
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def irq(self, handler=None, trigger=None):
+        pass
+
+    def write(self, data):
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def txdone(self):
+        return True
+
+    def any(self):
+        return 0
+
+    def readinto(self, buf):
+        return 0
+
+class _Pin:
+    OUT = 1
+    IN = 0
+    PULL_UP = 1
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def value(self, *args):
+        pass
+
+    def toggle(self):
+        pass
+
+class _Machine:
+    UART = _UART
+    Pin = _Pin
+
+    @staticmethod
+    def unique_id():
+        return b"\x00\x01\x02\x03\x04\x05\x06\x07"
+
+class _StateMachine:
+    """Stand-in for rp2.StateMachine (head_zoom's PIO UART)."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def irq(self, handler=None, hard=False):
+        pass
+
+    def active(self, *args):
+        pass
+
+    def rx_fifo(self):
+        return 0
+
+    def tx_fifo(self):
+        return 0
+
+    def put(self, value):
+        pass
+
+class _PIO:
+    OUT_HIGH = 1
+    SHIFT_RIGHT = 1
+    JOIN_TX = 1
+    JOIN_RX = 2
+
+class _Rp2:
+    PIO = _PIO
+    StateMachine = _StateMachine
+
+    @staticmethod
+    def asm_pio(**kwargs):
+        return lambda program: program
+
+sys.modules["machine"] = _Machine
+sys.modules["rp2"] = _Rp2
+
+import main
+import control_packet
+
+CASES = [
+    (0, 0, 0),
+    (300, -120, 5),
+    (-1, 1, -32768),
+    (32767, -300, 256),
+    (1000, 2000, -3000),
+]
+
+def baseline_crc16(data):
+    crc_register = 0
+    for byte in data:
+        for shift_register in range(8):
+            data_bit = (byte >> shift_register) & 1
+            crc_bit = (crc_register >> 15) & 1
+            crc_register = (crc_register << 1) & 0xFFFF
+            if data_bit != crc_bit:
+                crc_register ^= 0x8005
+    return crc_register
+
+def baseline_frame(packet):
+    _, _, _, yaw, pitch, roll, _ = struct.unpack("<h5H2s", packet[2:16])
+    payload = struct.pack(">3H", yaw, pitch, roll)
+    header = bytearray([45, len(payload), (45 + len(payload)) % 256]) + payload
+    crc = baseline_crc16(header)
+    return bytes(bytearray([0x24]) + header + bytearray([crc & 0xFF, (crc >> 8) & 0xFF]))
+
+def main_check():
+    sent = []
+    main.bgc.write_raw = lambda data: sent.append(bytes(data))
+    box = main.ControlMailbox()
+    control = main.ControlLoop()
+    now = 0
+    for yaw, pitch, roll in CASES:
+        # The previous case left a different value, so every case is sent
+        packet = control_packet.encode(0, 0, 0, yaw, pitch, roll)
+        box.post_packet(packet)
+        box.received_ms = now
+        del sent[:]
+        control.tick(box, now)
+        frames = [frame for frame in sent if frame[1] == 45]
+        expected = baseline_frame(packet)
+        assert frames == [expected], "(%d, %d, %d): sent %s, expected %s" % (
+            yaw, pitch, roll, [f.hex() for f in frames], expected.hex())
+        got = struct.unpack("<3h", frames[0][4:10])
+        assert got == (yaw, pitch, roll), "BGC would read %s" % (got,)
+        now += 1000
+    print("%s: %d control frames match the original BGC bytes" % (APP, len(CASES)))
+    print("OK")
+
+main_check()